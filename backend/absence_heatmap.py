@@ -0,0 +1,65 @@
+"""
+Carte de chaleur des absences : nombre de personnes absentes par département et par jour
+
+Chaque congé approuvé ajoute +1 au jour de début et -1 au lendemain de sa fin
+dans un tableau de différences (départements × jours) ; une somme cumulée
+donne ensuite les effectifs absents de chaque jour, sans boucle sur les jours.
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+def daily_absence_counts(
+    period_start: date,
+    period_end: date,
+    group_indices: np.ndarray,
+    starts: Sequence[date],
+    ends: Sequence[date],
+    groups: int
+) -> np.ndarray:
+    """Matrice (groupes × jours) des absents sur [period_start, period_end], dates de fin incluses"""
+    days = (period_end - period_start).days + 1
+    if len(group_indices) == 0:
+        return np.zeros((groups, days), dtype=np.int32)
+
+    origin = np.datetime64(period_start, "D")
+    first = np.clip((np.array(starts, dtype="datetime64[D]") - origin).astype(np.int64), 0, days)
+    last = np.clip((np.array(ends, dtype="datetime64[D]") - origin).astype(np.int64) + 1, 0, days)
+
+    difference = np.zeros((groups, days + 1), dtype=np.int32)
+    np.add.at(difference, (group_indices, first), 1)
+    np.add.at(difference, (group_indices, last), -1)
+    return np.cumsum(difference, axis=1)[:, :days]
+
+class AbsenceHeatmapCache:
+    """Cache des cartes de chaleur par (département, période), invalidé par plage de dates"""
+
+    def __init__(self, ttl_seconds: int = 600, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[Optional[str], date, date], Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, department: Optional[str], start: date, end: date) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get((department, start, end))
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                return None
+            return entry[1]
+
+    def put(self, department: Optional[str], start: date, end: date, value: dict):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[(department, start, end)] = (time.monotonic(), value)
+
+    def invalidate(self, start: date, end: date):
+        """Supprime les cartes dont la période recoupe [start, end]"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] <= end and start <= key[2]]:
+                del self._entries[key]
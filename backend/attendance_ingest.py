@@ -0,0 +1,174 @@
+"""
+Import des pointages des lecteurs de badges (exports CSV bruts)
+
+Le fichier est lu en flux, par paquets de lignes : la mémoire utilisée dépend de
+la taille d'un paquet, pas de celle du fichier. Chaque paquet est réduit à une
+première et une dernière badgeuse par (événement, employé) avant d'être fusionné
+en base ; la fusion (première entrée, dernière sortie) rend l'import rejouable.
+"""
+
+import csv
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+BADGE_COLUMNS = ("badge_id", "badge", "card_id", "card")
+TIMESTAMP_COLUMNS = ("timestamp", "datetime", "time", "date_time")
+TIMESTAMP_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M")
+
+# Pointages retenus autour d'un événement : arrivée anticipée, départ tardif
+EARLY_ARRIVAL = timedelta(minutes=60)
+LATE_DEPARTURE = timedelta(minutes=60)
+
+MAX_REPORTED_ERRORS = 100
+
+BadgeTap = Tuple[str, datetime, int]  # (badge, horodatage, numéro de ligne)
+
+class IngestReport:
+    """Avancement et anomalies d'un import, mis à jour paquet par paquet"""
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.matched_taps = 0
+        self.unknown_badges = 0
+        self.unmatched_taps = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+        self.unknown_badge_samples: set = set()
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def unknown_badge(self, badge_id: str):
+        self.unknown_badges += 1
+        if len(self.unknown_badge_samples) < MAX_REPORTED_ERRORS:
+            self.unknown_badge_samples.add(badge_id)
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "matched_taps": self.matched_taps,
+            "unknown_badges": self.unknown_badges,
+            "unknown_badge_samples": sorted(self.unknown_badge_samples),
+            "unmatched_taps": self.unmatched_taps,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+def parse_timestamp(value: str) -> datetime:
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        # Comme en base : UTC sans fuseau
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+    except ValueError:
+        pass
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, timestamp_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Horodatage invalide : {value}")
+
+def _column(header: List[str], candidates: Iterable[str]) -> Optional[int]:
+    normalized = [name.strip().lower() for name in header]
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized.index(candidate)
+    return None
+
+def read_badge_taps(stream: TextIO, report: IngestReport, chunk_size: int = 5000) -> Iterator[List[BadgeTap]]:
+    """Lecture en flux du CSV, par paquets de chunk_size pointages valides
+
+    Le séparateur (virgule ou point-virgule) est détecté sur l'en-tête ; les lignes
+    illisibles sont comptées dans le rapport et ignorées.
+    """
+    first_line = stream.readline()
+    if not first_line:
+        return
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    header = next(csv.reader([first_line], delimiter=delimiter))
+    badge_column = _column(header, BADGE_COLUMNS)
+    timestamp_column = _column(header, TIMESTAMP_COLUMNS)
+    if badge_column is None or timestamp_column is None:
+        raise ValueError("En-tête invalide : colonnes badge_id et timestamp requises")
+
+    chunk: List[BadgeTap] = []
+    for line, row in enumerate(csv.reader(stream, delimiter=delimiter), start=2):
+        if not row:
+            continue
+        report.rows += 1
+        try:
+            badge_id = row[badge_column].strip()
+            if not badge_id:
+                raise ValueError("Badge manquant")
+            chunk.append((badge_id, parse_timestamp(row[timestamp_column]), line))
+        except (IndexError, ValueError) as e:
+            report.error(line, str(e) if isinstance(e, ValueError) else "Colonnes manquantes")
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def derive_attendance_status(check_in: Optional[datetime], check_out: Optional[datetime],
+                             start: datetime, end: datetime, grace: timedelta) -> str:
+    """Statut de présence d'après les pointages et les horaires de l'événement"""
+    if check_in is None:
+        return "absent"
+    if check_in > start + grace:
+        return "late"
+    if check_out is not None and check_out < end - grace:
+        return "left_early"
+    return "present"
+
+def match_taps(
+    taps: List[BadgeTap],
+    employee_by_badge: Dict[str, str],
+    windows_by_employee: Dict[str, List[Tuple[datetime, datetime, str]]],
+    report: IngestReport
+) -> Dict[Tuple[str, str], List[datetime]]:
+    """Réduction d'un paquet : (événement, employé) -> [première badgeuse, dernière badgeuse]
+
+    windows_by_employee donne, par employé, les événements auxquels il participe
+    sous forme (début, fin, event_id) ; un pointage est rattaché à l'événement dont
+    la fenêtre élargie le contient et dont le début est le plus proche.
+    """
+    spans: Dict[Tuple[str, str], List[datetime]] = {}
+    for badge_id, timestamp, _ in taps:
+        employee_id = employee_by_badge.get(badge_id)
+        if employee_id is None:
+            report.unknown_badge(badge_id)
+            continue
+        candidates = [
+            (abs((timestamp - start).total_seconds()), event_id)
+            for start, end, event_id in windows_by_employee.get(employee_id, ())
+            if start - EARLY_ARRIVAL <= timestamp <= end + LATE_DEPARTURE
+        ]
+        if not candidates:
+            report.unmatched_taps += 1
+            continue
+        report.matched_taps += 1
+        key = (min(candidates)[1], employee_id)
+        span = spans.get(key)
+        if span is None:
+            spans[key] = [timestamp, timestamp]
+        else:
+            span[0] = min(span[0], timestamp)
+            span[1] = max(span[1], timestamp)
+    return spans
+
+def merge_span(existing_in: Optional[datetime], existing_out: Optional[datetime],
+               first: datetime, last: datetime) -> Tuple[datetime, Optional[datetime]]:
+    """Fusion avec la fiche existante : première entrée, dernière sortie (aucune sortie sur un pointage unique)"""
+    check_in = min(existing_in, first) if existing_in else first
+    check_out = max(value for value in (existing_out, existing_in, last) if value is not None)
+    return check_in, (check_out if check_out > check_in else None)
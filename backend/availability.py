@@ -0,0 +1,199 @@
+"""
+Moteur de disponibilité : bitmaps occupé/libre par employé et par jour
+
+Chaque journée chargée est un tableau NumPy uint64 (une ligne par employé) dont
+les 48 bits de poids faible représentent les créneaux de 30 minutes de la
+journée. Une question du type « qui est libre mardi 14h-16h parmi ces 2 000
+personnes ? » se résume à un masque et un ET binaire vectorisé.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 48 créneaux : tient dans un uint64
+
+BusyInterval = Tuple[str, datetime, datetime]  # (employee_id, début, fin exclue)
+
+def slot_mask(start_slot: int, end_slot: int) -> np.uint64:
+    """Masque des créneaux [start_slot, end_slot) d'une journée"""
+    if end_slot <= start_slot:
+        return np.uint64(0)
+    return np.uint64(((1 << (end_slot - start_slot)) - 1) << start_slot)
+
+def day_slot_ranges(start: datetime, end: datetime) -> List[Tuple[date, int, int]]:
+    """Découpage d'un intervalle [start, end) en plages de créneaux par jour"""
+    ranges = []
+    day = start.date()
+    while datetime.combine(day, datetime.min.time()) < end:
+        day_start = datetime.combine(day, datetime.min.time())
+        first = max(start, day_start)
+        last = min(end, day_start + timedelta(days=1))
+        start_slot = int((first - day_start).total_seconds() // (SLOT_MINUTES * 60))
+        end_slot = -int(-(last - day_start).total_seconds() // (SLOT_MINUTES * 60))
+        if end_slot > start_slot:
+            ranges.append((day, start_slot, min(end_slot, SLOTS_PER_DAY)))
+        day += timedelta(days=1)
+    return ranges
+
+def leave_interval(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """Un congé bloque des journées entières, date de fin incluse"""
+    return (
+        datetime.combine(start.date(), datetime.min.time()),
+        datetime.combine(end.date() + timedelta(days=1), datetime.min.time()),
+    )
+
+class AvailabilityIndex:
+    """Index en mémoire des bitmaps de disponibilité, chargé jour par jour"""
+
+    def __init__(self, max_days: int = 400, day_ttl_seconds: Optional[int] = 300):
+        self.max_days = max_days
+        self.day_ttl_seconds = day_ttl_seconds
+        self._rows: Dict[str, int] = {}
+        self._capacity = 1024
+        self._days: "OrderedDict[date, np.ndarray]" = OrderedDict()
+        self._loaded_at: Dict[date, float] = {}
+        self._lock = threading.RLock()
+
+    def _row(self, employee_id: str) -> int:
+        row = self._rows.get(employee_id)
+        if row is None:
+            row = len(self._rows)
+            self._rows[employee_id] = row
+            if row >= self._capacity:
+                self._capacity *= 2
+                for day, bits in self._days.items():
+                    grown = np.zeros(self._capacity, dtype=np.uint64)
+                    grown[:len(bits)] = bits
+                    self._days[day] = grown
+        return row
+
+    def rows_for(self, employee_ids: Sequence[str]) -> np.ndarray:
+        """Indices de ligne des employés (les inconnus sont ajoutés, sans occupation)"""
+        with self._lock:
+            return np.fromiter((self._row(str(employee_id)) for employee_id in employee_ids),
+                               dtype=np.int64, count=len(employee_ids))
+
+    def missing_days(self, days: Iterable[date]) -> List[date]:
+        """Jours absents de l'index ou dont le chargement a expiré"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                day for day in days
+                if day not in self._days or (
+                    self.day_ttl_seconds is not None
+                    and now - self._loaded_at[day] > self.day_ttl_seconds
+                )
+            ]
+
+    def load_days(self, days: Iterable[date], intervals: Iterable[BusyInterval]):
+        """(Re)construction complète des jours donnés à partir des intervalles occupés"""
+        days = set(days)
+        with self._lock:
+            for day in days:
+                self._days[day] = np.zeros(self._capacity, dtype=np.uint64)
+                self._days.move_to_end(day)
+                self._loaded_at[day] = time.monotonic()
+            for employee_id, start, end in intervals:
+                self._mark(str(employee_id), start, end, only_days=days)
+            while len(self._days) > self.max_days:
+                evicted, _ = self._days.popitem(last=False)
+                del self._loaded_at[evicted]
+
+    def mark_busy(self, employee_id: str, start: datetime, end: datetime):
+        """Mise à jour incrémentale : ajoute un intervalle occupé sur les jours chargés"""
+        with self._lock:
+            self._mark(str(employee_id), start, end)
+
+    def _mark(self, employee_id: str, start: datetime, end: datetime, only_days: Optional[set] = None):
+        row = None
+        for day, start_slot, end_slot in day_slot_ranges(start, end):
+            if day not in self._days or (only_days is not None and day not in only_days):
+                continue
+            if row is None:
+                row = self._row(employee_id)
+            self._days[day][row] |= slot_mask(start_slot, end_slot)
+
+    def invalidate(self, start_day: date, end_day: date):
+        """Décharge les jours [start_day, end_day] : ils seront reconstruits à la prochaine requête
+
+        Utilisé quand une occupation disparaît (annulation, refus, suppression),
+        un OU binaire ne pouvant pas être défait lorsque des intervalles se recouvrent.
+        """
+        with self._lock:
+            for day in [day for day in self._days if start_day <= day <= end_day]:
+                del self._days[day]
+                del self._loaded_at[day]
+
+    def busy_bits(self, day: date, rows: np.ndarray) -> np.ndarray:
+        """Bitmaps (uint64) des lignes données pour un jour chargé"""
+        with self._lock:
+            return self._days[day][rows]
+
+    def busy_slots(self, day: date, rows: np.ndarray) -> np.ndarray:
+        """Matrice booléenne (employés × créneaux) d'occupation pour un jour chargé"""
+        bits = self.busy_bits(day, rows)
+        shifts = np.arange(SLOTS_PER_DAY, dtype=np.uint64)
+        return ((bits[:, None] >> shifts) & np.uint64(1)).astype(bool)
+
+    def free_mask(self, employee_ids: Sequence[str], start: datetime, end: datetime) -> np.ndarray:
+        """Vecteur booléen : l'employé est-il libre sur tout l'intervalle [start, end) ?
+
+        Les jours concernés doivent avoir été chargés au préalable.
+        """
+        rows = self.rows_for(employee_ids)
+        busy = np.zeros(len(rows), dtype=bool)
+        for day, start_slot, end_slot in day_slot_ranges(start, end):
+            busy |= (self.busy_bits(day, rows) & slot_mask(start_slot, end_slot)) != 0
+        return ~busy
+
+    def busy_cube(self, days: Sequence[date], rows: np.ndarray) -> np.ndarray:
+        """Tenseur booléen (jours × employés × créneaux) d'occupation pour des jours chargés"""
+        shifts = np.arange(SLOTS_PER_DAY, dtype=np.uint64)
+        with self._lock:
+            bits = np.stack([self._days[day][rows] for day in days]) if days else np.zeros((0, len(rows)), dtype=np.uint64)
+        return ((bits[:, :, None] >> shifts) & np.uint64(1)).astype(bool)
+
+def rank_slots(busy: np.ndarray, duration_slots: int, allowed_starts: np.ndarray, top_n: int) -> List[Tuple[int, int, int]]:
+    """Meilleurs créneaux de duration_slots créneaux consécutifs, classés par nombre de personnes libres
+
+    busy est le tenseur (jours × employés × créneaux) d'occupation et allowed_starts le
+    masque (jours × créneaux de départ possibles) des débuts autorisés. Les sommes
+    cumulées donnent en une opération l'occupation de chaque employé sur chaque fenêtre
+    glissante ; aucun créneau n'est sondé individuellement. Les créneaux retenus ne se
+    chevauchent pas.
+
+    Retourne des tuples (indice du jour, créneau de départ, nombre de personnes libres),
+    triés par disponibilité décroissante puis par date.
+    """
+    days, _, slots = busy.shape
+    starts = slots - duration_slots + 1
+    if days == 0 or starts <= 0:
+        return []
+
+    cumulative = np.zeros((days, busy.shape[1], slots + 1), dtype=np.int32)
+    np.cumsum(busy, axis=2, out=cumulative[:, :, 1:])
+    busy_in_window = cumulative[:, :, duration_slots:] - cumulative[:, :, :starts]
+    free_counts = (busy_in_window == 0).sum(axis=1)
+
+    scores = np.where(allowed_starts[:, :starts], free_counts, -1).ravel()
+    candidates = np.flatnonzero(scores >= 0)
+    # Disponibilité décroissante, puis ordre chronologique
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    selected: List[Tuple[int, int, int]] = []
+    taken = np.zeros((days, slots), dtype=bool)
+    for index in candidates:
+        day, start_slot = divmod(int(index), starts)
+        if taken[day, start_slot:start_slot + duration_slots].any():
+            continue
+        taken[day, start_slot:start_slot + duration_slots] = True
+        selected.append((day, start_slot, int(scores[index])))
+        if len(selected) == top_n:
+            break
+    return selected
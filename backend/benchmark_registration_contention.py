@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark de contention des inscriptions aux événements
+
+Lance des inscriptions concurrentes sur un événement à capacité limitée,
+directement contre la base locale (DATABASE_URL), vérifie qu'il n'y a
+aucune surréservation et mesure le débit.
+
+Usage: python benchmark_registration_contention.py [inscriptions] [capacité] [workers]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import (
+    DATABASE_URL, Employee, Event, EventRegistration, EventType, EventStatus,
+    create_event_registration
+)
+
+def create_fixtures(db, registrations: int, capacity: int):
+    """Création d'un événement et des employés de test"""
+    run_id = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    event = Event(
+        title=f"Benchmark contention {run_id}",
+        type=EventType.training,
+        start_date=datetime.utcnow() + timedelta(days=30),
+        end_date=datetime.utcnow() + timedelta(days=30, hours=2),
+        location="Benchmark",
+        organizer="benchmark",
+        max_attendees=capacity,
+        status=EventStatus.published
+    )
+    db.add(event)
+
+    employees = [
+        Employee(
+            name=f"Bench {i}",
+            email=f"bench.{run_id}.{i}@benchmark.local",
+            password_hash="!",
+            department="Benchmark",
+            job_title="Benchmark",
+            seniority="Junior"
+        )
+        for i in range(registrations)
+    ]
+    db.add_all(employees)
+    db.commit()
+
+    return str(event.id), [str(employee.id) for employee in employees]
+
+def cleanup_fixtures(db, event_id: str, employee_ids: list):
+    """Suppression des données de test"""
+    db.query(EventRegistration).filter(EventRegistration.event_id == event_id).delete(synchronize_session=False)
+    db.query(Event).filter(Event.id == event_id).delete(synchronize_session=False)
+    db.query(Employee).filter(Employee.id.in_(employee_ids)).delete(synchronize_session=False)
+    db.commit()
+
+def run_benchmark(registrations: int = 500, capacity: int = 50, workers: int = 32) -> bool:
+    """Exécution du benchmark et vérification de l'absence de surréservation"""
+    print("🏁 Benchmark de contention des inscriptions")
+    print(f"   Inscriptions: {registrations} | Capacité: {capacity} | Workers: {workers}")
+
+    engine = create_engine(DATABASE_URL, pool_size=workers, max_overflow=0, pool_pre_ping=True)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    setup_db = Session()
+    event_id, employee_ids = create_fixtures(setup_db, registrations, capacity)
+
+    def register(employee_id: str):
+        db = Session()
+        started = time.perf_counter()
+        try:
+            registration = create_event_registration(db, event_id, employee_id)
+            # None : inscription refusée (événement introuvable), comptée à part
+            status = registration.status if registration else "rejected"
+            return status, time.perf_counter() - started
+        finally:
+            db.close()
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(register, employee_ids))
+        elapsed = time.perf_counter() - started
+
+        statuses = [status for status, _ in results]
+        accepted = registrations - statuses.count("rejected")
+        latencies = sorted(latency for _, latency in results)
+
+        setup_db.expire_all()
+        confirmed_rows = setup_db.query(EventRegistration).filter(
+            EventRegistration.event_id == event_id,
+            EventRegistration.status == "confirmed"
+        ).count()
+        waitlist_rows = setup_db.query(EventRegistration).filter(
+            EventRegistration.event_id == event_id,
+            EventRegistration.status == "waitlist"
+        ).count()
+        event = setup_db.query(Event).filter(Event.id == event_id).first()
+
+        print("\n📊 Résultats")
+        print(f"   Confirmés: {statuses.count('confirmed')} | Liste d'attente: {statuses.count('waitlist')} | "
+              f"Refusées: {statuses.count('rejected')}")
+        print(f"   En base: {confirmed_rows} confirmés, {waitlist_rows} en attente")
+        print(f"   Compteurs: {event.confirmed_count} confirmés, {event.waitlist_count} en attente")
+        print(f"   Débit: {registrations / elapsed:.0f} inscriptions/s ({elapsed:.2f}s)")
+        print(f"   Latence p50: {latencies[len(latencies) // 2] * 1000:.1f} ms | "
+              f"p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+        expected_confirmed = min(accepted, capacity)
+        assert confirmed_rows <= capacity, f"Surréservation: {confirmed_rows} > {capacity}"
+        assert confirmed_rows == expected_confirmed, f"Places perdues: {confirmed_rows} != {expected_confirmed}"
+        assert confirmed_rows + waitlist_rows == accepted, "Inscriptions manquantes"
+        assert event.confirmed_count == confirmed_rows, "Compteur confirmed_count incohérent"
+        assert event.waitlist_count == waitlist_rows, "Compteur waitlist_count incohérent"
+
+        print("\n✅ Aucune surréservation, compteurs cohérents")
+        return True
+
+    except AssertionError as e:
+        print(f"\n❌ {str(e)}")
+        return False
+    finally:
+        cleanup_fixtures(setup_db, event_id, employee_ids)
+        setup_db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    success = run_benchmark(*args)
+    sys.exit(0 if success else 1)
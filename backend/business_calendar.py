@@ -0,0 +1,141 @@
+"""
+Calendrier des jours ouvrés : week-ends et jours fériés exclus
+
+Pour chaque calendrier de jours fériés, un tableau cumulé du nombre de jours
+ouvrés depuis l'origine est précalculé ; le nombre de jours ouvrés d'une
+période se lit alors par une simple différence de deux cases, en O(1), et des
+milliers de périodes se calculent d'un coup par indexation NumPy.
+"""
+
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import numpy as np
+
+def easter_sunday(year: int) -> date:
+    """Dimanche de Pâques (calendrier grégorien, algorithme de Meeus/Jones/Butcher)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def french_holidays(year: int) -> Set[date]:
+    """Jours fériés légaux en France métropolitaine"""
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1),                # Jour de l'an
+        easter + timedelta(days=1),      # Lundi de Pâques
+        date(year, 5, 1),                # Fête du travail
+        date(year, 5, 8),                # Victoire 1945
+        easter + timedelta(days=39),     # Ascension
+        easter + timedelta(days=50),     # Lundi de Pentecôte
+        date(year, 7, 14),               # Fête nationale
+        date(year, 8, 15),               # Assomption
+        date(year, 11, 1),               # Toussaint
+        date(year, 11, 11),              # Armistice
+        date(year, 12, 25),              # Noël
+    }
+
+def alsace_moselle_holidays(year: int) -> Set[date]:
+    """Jours fériés en Alsace-Moselle : Vendredi saint et Saint-Étienne en plus"""
+    return french_holidays(year) | {
+        easter_sunday(year) - timedelta(days=2),
+        date(year, 12, 26),
+    }
+
+HOLIDAY_CALENDARS: Dict[str, Callable[[int], Set[date]]] = {
+    "FR": french_holidays,
+    "FR-57": alsace_moselle_holidays,
+}
+
+class BusinessCalendar:
+    """Jours ouvrés cumulés d'un calendrier de jours fériés sur une plage d'années"""
+
+    def __init__(self, holidays: Callable[[int], Set[date]], first_year: int = 2000, last_year: int = 2050):
+        self.holidays = holidays
+        self._lock = threading.Lock()
+        self._build(first_year, last_year)
+
+    def _build(self, first_year: int, last_year: int):
+        origin = date(first_year, 1, 1)
+        days = (date(last_year + 1, 1, 1) - origin).days
+        # 1970-01-01 était un jeudi : (jours depuis l'époque + 3) % 7 donne le jour de la semaine (lundi = 0)
+        epoch_days = np.arange(days) + (origin - date(1970, 1, 1)).days
+        working = (epoch_days + 3) % 7 < 5
+        holidays = [
+            (holiday - origin).days
+            for year in range(first_year, last_year + 1)
+            for holiday in self.holidays(year)
+        ]
+        working[holidays] = False
+
+        cumulative = np.zeros(days + 1, dtype=np.int32)
+        np.cumsum(working, out=cumulative[1:])
+        self.first_year, self.last_year = first_year, last_year
+        self.origin = origin
+        self._working = working
+        self._cumulative = cumulative
+
+    def _ensure_years(self, first_year: int, last_year: int):
+        if first_year < self.first_year or last_year > self.last_year:
+            with self._lock:
+                self._build(min(first_year, self.first_year), max(last_year, self.last_year))
+
+    def is_working_day(self, day: date) -> bool:
+        self._ensure_years(day.year, day.year)
+        return bool(self._working[(day - self.origin).days])
+
+    def working_mask(self, start: date, end: date) -> np.ndarray:
+        """Vecteur booléen des jours ouvrés de [start, end], un élément par jour"""
+        if end < start:
+            return np.zeros(0, dtype=bool)
+        self._ensure_years(start.year, end.year)
+        first = (start - self.origin).days
+        return self._working[first:first + (end - start).days + 1].copy()
+
+    def working_days(self, start: date, end: date) -> int:
+        """Jours ouvrés de [start, end], bornes incluses (0 si end < start)"""
+        if end < start:
+            return 0
+        self._ensure_years(start.year, end.year)
+        return int(self._cumulative[(end - self.origin).days + 1] - self._cumulative[(start - self.origin).days])
+
+    def working_days_batch(self, starts: Iterable[date], ends: Iterable[date]) -> np.ndarray:
+        """Jours ouvrés de nombreuses périodes [start, end] en une opération vectorisée"""
+        starts = np.array(list(starts), dtype="datetime64[D]")
+        ends = np.array(list(ends), dtype="datetime64[D]")
+        if starts.size == 0:
+            return np.zeros(0, dtype=np.int32)
+        self._ensure_years(int(str(starts.min())[:4]), int(str(ends.max())[:4]))
+
+        origin = np.datetime64(self.origin, "D")
+        first = (starts - origin).astype(np.int64)
+        last = (ends - origin).astype(np.int64) + 1
+        counts = self._cumulative[np.maximum(last, first)] - self._cumulative[first]
+        return counts
+
+    def working_days_by_year(self, start: date, end: date) -> Dict[int, int]:
+        """Jours ouvrés de [start, end] répartis par année civile"""
+        return {
+            year: self.working_days(max(start, date(year, 1, 1)), min(end, date(year, 12, 31)))
+            for year in range(start.year, end.year + 1)
+        }
+
+_calendars: Dict[str, BusinessCalendar] = {}
+
+def get_business_calendar(code: Optional[str] = None) -> BusinessCalendar:
+    """Calendrier des jours ouvrés d'un code (FR par défaut), construit une fois par processus"""
+    code = code or "FR"
+    if code not in HOLIDAY_CALENDARS:
+        raise KeyError(code)
+    if code not in _calendars:
+        _calendars[code] = BusinessCalendar(HOLIDAY_CALENDARS[code])
+    return _calendars[code]
@@ -65,6 +65,14 @@ class Config:
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # 1 heure
     
+    # Calendrier des jours fériés (FR, FR-57 pour l'Alsace-Moselle)
+    HOLIDAY_CALENDAR: str = os.getenv("HOLIDAY_CALENDAR", "FR")
+    
+    # Tolérance (minutes) avant qu'une arrivée soit en retard ou un départ anticipé
+    ATTENDANCE_GRACE_MINUTES: int = int(os.getenv("ATTENDANCE_GRACE_MINUTES", "10"))
+    # Intervalle (secondes) de la finalisation des présences des événements terminés (0 : désactivée)
+    ATTENDANCE_FINALIZATION_INTERVAL: int = int(os.getenv("ATTENDANCE_FINALIZATION_INTERVAL", "300"))
+    
     # Configuration des logs
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script d'import des pointages des lecteurs de badges (export CSV) dans les
+fiches de présence (attendance)
+"""
+
+import os
+import sys
+
+from main import SessionLocal, ingest_badge_taps
+
+def main():
+    """Importe un fichier CSV de pointages, en flux, avec affichage de l'avancement"""
+    if len(sys.argv) < 2:
+        print("Usage: python ingest_badge_taps.py <fichier.csv> [taille_paquet]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    size = os.path.getsize(path)
+    print(f"🔧 Import des pointages de {path}...")
+
+    db = SessionLocal()
+
+    try:
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as stream:
+            def progress(report):
+                position = stream.buffer.tell() if size else 0
+                print(f"   Paquet {report.chunks}: {report.rows} ligne(s) lue(s) "
+                      f"({position * 100 // max(size, 1)}%), {report.inserted} créée(s), {report.updated} mise(s) à jour")
+
+            report = ingest_badge_taps(db, stream, chunk_size, progress)
+
+        print(f"\n✅ {report.rows} ligne(s) lue(s), {report.matched_taps} pointage(s) rattaché(s)")
+        print(f"   Fiches: {report.inserted} créée(s), {report.updated} mise(s) à jour")
+        if report.unknown_badges:
+            print(f"⚠️  {report.unknown_badges} pointage(s) de badge inconnu "
+                  f"(ex. {', '.join(sorted(report.unknown_badge_samples)[:10])})")
+        if report.unmatched_taps:
+            print(f"⚠️  {report.unmatched_taps} pointage(s) hors de tout événement")
+        for error in report.errors:
+            print(f"❌ Ligne {error['line']}: {error['error']}")
+        if report.error_count > len(report.errors):
+            print(f"❌ ... {report.error_count - len(report.errors)} autre(s) erreur(s)")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur: {str(e)}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Integer, Text, ForeignKey, Enum
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import create_engine, Column, String, Date, DateTime, Boolean, Integer, Float, Text, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import text, update, select, insert, func, and_, or_, exists, case, extract, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, Session, relationship, joinedload
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.dialects.postgresql import UUID
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Generic, TypeVar
+import asyncio
+from collections import Counter
+import uuid
 from uuid import uuid4
 import enum
 import os
@@ -20,6 +25,9 @@ T = TypeVar('T')
 from contextlib import asynccontextmanager
 import secrets
 import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # Import des bibliothèques d'export
 import csv
@@ -35,6 +43,14 @@ from datetime import datetime, timedelta
 
 # Import de la configuration
 from config import config
+from room_calendar import RoomCalendar
+from absence_heatmap import AbsenceHeatmapCache, daily_absence_counts
+from business_calendar import HOLIDAY_CALENDARS, get_business_calendar
+from smtp_pool import SMTPPool
+from attendance_ingest import EARLY_ARRIVAL, LATE_DEPARTURE, IngestReport, derive_attendance_status, match_taps, merge_span, read_badge_taps
+from shared.leave_statistics import summarize_leave_groups
+from availability import AvailabilityIndex, SLOT_MINUTES, SLOTS_PER_DAY, day_slot_ranges, leave_interval, rank_slots
+import numpy as np
 
 # Security
 SECRET_KEY = config.JWT_SECRET_KEY
@@ -97,6 +113,7 @@ class NotificationType(str, enum.Enum):
     leave_approval = "leave_approval"
     leave_rejection = "leave_rejection"
     event_invitation = "event_invitation"
+    waitlist_promotion = "waitlist_promotion"
 
 # Database Models
 class Employee(Base):
@@ -111,6 +128,7 @@ class Employee(Base):
     job_title = Column(String, nullable=False)
     seniority = Column(String, nullable=False)
     avatar = Column(String, nullable=True)
+    badge_id = Column(String, unique=True, nullable=True)  # Identifiant du badge d'accès
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -120,6 +138,22 @@ class Employee(Base):
     notifications = relationship("Notification", back_populates="user")
     event_registrations = relationship("EventRegistration", back_populates="employee")
 
+class Room(Base):
+    __tablename__ = "rooms"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    name = Column(String, unique=True, nullable=False)
+    location = Column(String, nullable=True)  # Site, bâtiment, étage
+    capacity = Column(Integer, nullable=True)
+    is_active = Column(Boolean, default=True)
+    # Incrémentée à chaque réservation ou libération : invalide le calendrier en mémoire des autres processus
+    calendar_version = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    events = relationship("Event", back_populates="room")
+
 class Event(Base):
     __tablename__ = "events"
     
@@ -130,17 +164,34 @@ class Event(Base):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     location = Column(String, nullable=False)
+    room_id = Column(UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=True, index=True)
     organizer = Column(String, nullable=False)
     attendees = Column(Text)  # JSON string of employee IDs
     max_attendees = Column(Integer, nullable=True)
     is_recurring = Column(Boolean, default=False)
     recurrence_pattern = Column(String, nullable=True)
     status = Column(Enum(EventStatus), default=EventStatus.draft)
+    cancellation_deadline = Column(DateTime, nullable=True)
+    # Compteurs dénormalisés, maintenus atomiquement à chaque changement d'inscription
+    confirmed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    waitlist_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Classement des présences fait (finalize_ended_events) ; remis à NULL si les horaires changent
+    attendance_finalized_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     registrations = relationship("EventRegistration", back_populates="event")
+    room = relationship("Room", back_populates="events")
+
+    __table_args__ = (
+        # Finalisation des présences : événements terminés non encore traités, par date de fin
+        Index(
+            "ix_events_unfinalized_end", "end_date", "id",
+            postgresql_where=text("attendance_finalized_at IS NULL"),
+            sqlite_where=text("attendance_finalized_at IS NULL")
+        ),
+    )
 
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
@@ -156,12 +207,80 @@ class LeaveRequest(Base):
     hr_approval = Column(Boolean, nullable=True)
     approved_by = Column(String, nullable=True)
     rejection_reason = Column(Text, nullable=True)
+    # Département de l'employé, dénormalisé pour la boîte de réception des approbateurs
+    department = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     employee = relationship("Employee", back_populates="leave_requests")
 
+    __table_args__ = (
+        # Recherche de chevauchements par employé et statut
+        Index("ix_leave_requests_employee_status_dates", "employee_id", "status", "start_date", "end_date"),
+        # Boîte de réception : demandes en attente d'un département, les plus anciennes d'abord
+        Index(
+            "ix_leave_requests_pending_department_created", "department", "created_at", "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'")
+        ),
+    )
+
+class LeaveLedgerEntry(Base):
+    __tablename__ = "leave_ledger_entries"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    employee_id = Column(UUID(as_uuid=True), ForeignKey("employees.id"), nullable=False)
+    leave_type = Column(Enum(LeaveType), nullable=False)
+    year = Column(Integer, nullable=False)
+    entry_type = Column(String, nullable=False)  # entitlement, accrual, adjustment, consumption, reversal
+    days = Column(Float, nullable=False)  # Variation signée du solde disponible
+    # Sans clé étrangère : l'historique survit à la suppression de la demande
+    leave_request_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    description = Column(Text, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_leave_ledger_employee_type_year", "employee_id", "leave_type", "year"),
+    )
+
+class LeaveBalance(Base):
+    __tablename__ = "leave_balances"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    employee_id = Column(UUID(as_uuid=True), ForeignKey("employees.id"), nullable=False)
+    leave_type = Column(Enum(LeaveType), nullable=False)
+    year = Column(Integer, nullable=False)
+    # Soldes maintenus incrémentalement dans la transaction de chaque écriture au grand livre
+    entitled_days = Column(Float, nullable=False, default=0, server_default="0")
+    used_days = Column(Float, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("employee_id", "leave_type", "year", name="uq_leave_balances_employee_type_year"),
+    )
+
+class DepartmentStaffingRule(Base):
+    __tablename__ = "department_staffing_rules"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    department = Column(String, unique=True, nullable=False)
+    min_present = Column(Integer, nullable=False)  # Effectif présent minimum par jour
+    include_weekends = Column(Boolean, default=False)  # Sinon seuls les jours ouvrés sont contrôlés
+    updated_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+    
+    # Position atteinte par un traitement périodique : (horodatage, clé) du dernier élément traité
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
+    watermark_key = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Notification(Base):
     __tablename__ = "notifications"
     
@@ -189,6 +308,38 @@ class Attendance(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Statistiques de présence : GROUP BY status sur un parcours d'index par événement
+        Index("ix_attendance_event_status", "event_id", "status"),
+    )
+
+class AttendanceRollup(Base):
+    __tablename__ = "attendance_rollups"
+    
+    # Nombre de fiches de présence par statut, maintenu à chaque changement de statut
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    department = Column(String, nullable=False)
+    event_type = Column(Enum(EventType), nullable=False)
+    month = Column(Date, nullable=False)  # Premier jour du mois de début de l'événement
+    status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        UniqueConstraint("department", "event_type", "month", "status", name="uq_attendance_rollups_group_status"),
+    )
+
+class EmployeeAttendanceRollup(Base):
+    __tablename__ = "employee_attendance_rollups"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    employee_id = Column(UUID(as_uuid=True), ForeignKey("employees.id"), nullable=False)
+    status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        UniqueConstraint("employee_id", "status", name="uq_employee_attendance_rollups_employee_status"),
+    )
+
 # Event Registration Models
 class EventRegistration(Base):
     __tablename__ = "event_registrations"
@@ -199,6 +350,7 @@ class EventRegistration(Base):
     registration_date = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="confirmed")  # confirmed, waitlist, cancelled
     confirmation_code = Column(String, nullable=True)  # 2FA security
+    confirmed_at = Column(DateTime, nullable=True)  # Validation du code de confirmation
     ip_address = Column(String, nullable=True)  # Security audit trail
     user_agent = Column(String, nullable=True)  # Security audit trail
     session_id = Column(String, nullable=True)  # Security audit trail
@@ -213,6 +365,14 @@ class EventRegistration(Base):
     event = relationship("Event", back_populates="registrations")
     employee = relationship("Employee", back_populates="event_registrations")
 
+    __table_args__ = (
+        # Accès FIFO à la liste d'attente d'un événement
+        Index("ix_event_registrations_event_status_date", "event_id", "status", "registration_date"),
+        Index("ix_event_registrations_employee_status", "employee_id", "status"),
+        # Recherche instantanée par code (confirmation, scan aux bornes d'accueil)
+        Index("ux_event_registrations_confirmation_code", "confirmation_code", unique=True),
+    )
+
 class RegistrationConflict(Base):
     __tablename__ = "registration_conflicts"
     
@@ -296,6 +456,7 @@ class EmployeeBase(BaseModel):
     job_title: str
     seniority: str
     avatar: Optional[str] = None
+    badge_id: Optional[str] = None
 
 class EmployeeCreate(EmployeeBase):
     pass
@@ -307,6 +468,7 @@ class EmployeeUpdate(BaseModel):
     job_title: Optional[str] = None
     seniority: Optional[str] = None
     avatar: Optional[str] = None
+    badge_id: Optional[str] = None
 
 class EmployeeResponse(EmployeeBase):
     id: str
@@ -323,6 +485,7 @@ class EventBase(BaseModel):
     start_date: datetime
     end_date: datetime
     location: str
+    room_id: Optional[str] = None
     organizer: str
     attendees: List[str] = []
     max_attendees: Optional[int] = None
@@ -340,6 +503,7 @@ class EventUpdate(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     location: Optional[str] = None
+    room_id: Optional[str] = None
     organizer: Optional[str] = None
     attendees: Optional[List[str]] = None
     max_attendees: Optional[int] = None
@@ -349,6 +513,8 @@ class EventUpdate(BaseModel):
 
 class EventResponse(EventBase):
     id: str
+    confirmed_count: int = 0
+    waitlist_count: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -383,6 +549,7 @@ class LeaveRequestResponse(LeaveRequestBase):
     hr_approval: Optional[bool]
     approved_by: Optional[str]
     rejection_reason: Optional[str]
+    department: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     employee: Optional[EmployeeResponse] = None
@@ -438,6 +605,16 @@ class AttendanceStats(BaseModel):
     attendance_rate: float
     late_rate: float
 
+class EventAttendanceStats(AttendanceStats):
+    event_id: str
+    title: str
+    start_date: datetime
+
+class AttendanceStatsBatchRequest(BaseModel):
+    event_ids: Optional[List[str]] = Field(None, min_length=1, max_length=500)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
 class PaginatedResponse(BaseModel):
     data: List[Any]
     total: int
@@ -504,11 +681,121 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise credentials_exception
     return user
 
+# Mises à jour de schéma idempotentes : create_all ne modifie pas les tables existantes
+SCHEMA_UPGRADES = [
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS cancellation_deadline TIMESTAMP",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'events' AND column_name = 'confirmed_count'
+        ) THEN
+            ALTER TABLE events ADD COLUMN confirmed_count INTEGER NOT NULL DEFAULT 0;
+            ALTER TABLE events ADD COLUMN waitlist_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE events SET
+                confirmed_count = (SELECT COUNT(*) FROM event_registrations r
+                                   WHERE r.event_id = events.id AND r.status = 'confirmed'),
+                waitlist_count = (SELECT COUNT(*) FROM event_registrations r
+                                  WHERE r.event_id = events.id AND r.status = 'waitlist');
+        END IF;
+    END $$
+    """,
+    "ALTER TYPE notificationtype ADD VALUE IF NOT EXISTS 'waitlist_promotion'",
+    "CREATE INDEX IF NOT EXISTS ix_event_registrations_event_status_date "
+    "ON event_registrations (event_id, status, registration_date)",
+    "CREATE INDEX IF NOT EXISTS ix_event_registrations_employee_status "
+    "ON event_registrations (employee_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_leave_requests_employee_status_dates "
+    "ON leave_requests (employee_id, status, start_date, end_date)",
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS room_id UUID REFERENCES rooms(id)",
+    "CREATE INDEX IF NOT EXISTS ix_events_room_id ON events (room_id)",
+    "ALTER TABLE event_registrations ADD COLUMN IF NOT EXISTS confirmed_at TIMESTAMP",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_event_registrations_confirmation_code "
+    "ON event_registrations (confirmation_code)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_event_status ON attendance (event_id, status)",
+    "ALTER TABLE employees ADD COLUMN IF NOT EXISTS badge_id VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_employees_badge_id ON employees (badge_id)",
+    "ALTER TABLE leave_requests ADD COLUMN IF NOT EXISTS department VARCHAR",
+    # Rattrapage des demandes créées sans département (scripts d'import, anciennes lignes)
+    "UPDATE leave_requests SET department = e.department FROM employees e "
+    "WHERE e.id = leave_requests.employee_id AND leave_requests.department IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_leave_requests_pending_department_created "
+    "ON leave_requests (department, created_at, id) WHERE status = 'pending'",
+    # Garantie en base contre les congés qui se chevauchent (échoue sans effet si des doublons existent déjà),
+    # en journées entières comme leave_interval ; l'ancienne contrainte sur les horodatages bruts est remplacée
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'ex_leave_requests_no_overlap' AND pg_get_constraintdef(oid) LIKE '%date_trunc%'
+        ) THEN
+            ALTER TABLE leave_requests DROP CONSTRAINT IF EXISTS ex_leave_requests_no_overlap;
+            ALTER TABLE leave_requests ADD CONSTRAINT ex_leave_requests_no_overlap
+                EXCLUDE USING gist (
+                    employee_id WITH =,
+                    tsrange(date_trunc('day', start_date), date_trunc('day', end_date) + interval '1 day', '[)') WITH &&
+                )
+                WHERE (status IN ('pending', 'approved'));
+        END IF;
+    END $$
+    """,
+    # Événements déjà traités avant le marquage par événement : ceux qui précèdent l'ancien filigrane
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'events' AND column_name = 'attendance_finalized_at'
+        ) THEN
+            ALTER TABLE events ADD COLUMN attendance_finalized_at TIMESTAMP;
+            UPDATE events SET attendance_finalized_at = w.updated_at
+            FROM job_watermarks w
+            WHERE w.name = 'attendance_finalization' AND events.end_date < w.watermark;
+        END IF;
+    END $$
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_events_unfinalized_end "
+    "ON events (end_date, id) WHERE attendance_finalized_at IS NULL",
+]
+
+def apply_schema_upgrades():
+    """Application des mises à jour de schéma PostgreSQL (sans effet sur SQLite)"""
+    if engine.dialect.name != "postgresql":
+        return
+    for statement in SCHEMA_UPGRADES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour du schéma: {str(e)}")
+
 # Create tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    apply_schema_upgrades()
+    try:
+        backfilled = backfill_attendance_rollups()
+        if backfilled:
+            logger.info(f"Attendance rollups backfilled: {backfilled['groups']} group(s), {backfilled['employees']} employee(s)")
+    except Exception as e:
+        logger.error(f"Erreur lors du remplissage des cumuls de présence: {str(e)}")
+    try:
+        backfilled = backfill_leave_ledger()
+        if backfilled:
+            logger.info(f"Leave ledger backfilled: consumption posted for {backfilled} approved leave(s)")
+    except Exception as e:
+        logger.error(f"Erreur lors de la reprise du grand livre des congés: {str(e)}")
+    finalization_task = None
+    if config.ATTENDANCE_FINALIZATION_INTERVAL > 0:
+        finalization_task = asyncio.create_task(attendance_finalization_loop(config.ATTENDANCE_FINALIZATION_INTERVAL))
     yield
+    if finalization_task:
+        finalization_task.cancel()
+    await smtp_pool.close()
 
 # FastAPI app
 app = FastAPI(
@@ -1167,8 +1454,16 @@ def update_employee(
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    for field, value in employee.dict(exclude_unset=True).items():
+    update_data = employee.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(db_employee, field, value)
+
+    # Les demandes en attente suivent l'employé dans la boîte de réception de son nouveau département
+    if update_data.get('department'):
+        db.query(LeaveRequest).filter(
+            LeaveRequest.employee_id == db_employee.id,
+            LeaveRequest.status == LeaveStatus.pending
+        ).update({LeaveRequest.department: update_data['department']}, synchronize_session=False)
     
     db.commit()
     db.refresh(db_employee)
@@ -1267,9 +1562,16 @@ def create_event(
     event_data['attendees'] = json.dumps(event_data['attendees'])
     
     db_event = Event(**event_data)
+    db_event.id = uuid4()
+    room = None
+    if db_event.room_id and db_event.status != EventStatus.cancelled:
+        room = reserve_room(db, db_event.room_id, db_event.start_date, db_event.end_date,
+                            max_attendees=db_event.max_attendees)
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    if room:
+        room_calendar.book(str(room.id), room.calendar_version, str(db_event.id), db_event.start_date, db_event.end_date)
     
     # Convert back for response
     db_event.attendees = event.attendees
@@ -1292,13 +1594,49 @@ def update_event(
         raise HTTPException(status_code=404, detail="Event not found")
     
     import json
-    for field, value in event.dict(exclude_unset=True).items():
+    update_data = event.dict(exclude_unset=True)
+    previous_dates = (db_event.start_date, db_event.end_date)
+    previous_rollup_key = event_rollup_key(db_event)
+    previous_room_id = db_event.room_id if db_event.status != EventStatus.cancelled else None
+    for field, value in update_data.items():
         if field == 'attendees' and value is not None:
             value = json.dumps(value)
         setattr(db_event, field, value)
+
+    # Réservation de salle : libération de l'ancienne, vérification de la nouvelle
+    released_room = booked_room = None
+    if update_data.keys() & {'room_id', 'start_date', 'end_date', 'status', 'max_attendees'}:
+        room_id = db_event.room_id if db_event.status != EventStatus.cancelled else None
+        if previous_room_id and str(previous_room_id) != str(room_id):
+            released_room = release_room(db, previous_room_id)
+        if room_id:
+            booked_room = reserve_room(db, room_id, db_event.start_date, db_event.end_date,
+                                       event_id=str(db_event.id), max_attendees=db_event.max_attendees)
+    # Type ou mois de début modifié : les cumuls de présence suivent l'événement
+    if update_data.keys() & {'type', 'start_date'}:
+        move_event_attendance_rollups(db, db_event.id, previous_rollup_key, event_rollup_key(db_event))
+
+    # Horaires ou statut modifiés : les présences sont reclassées au prochain passage de la finalisation
+    if update_data.keys() & {'start_date', 'end_date', 'status'}:
+        db_event.attendance_finalized_at = None
+    db.flush()
+
+    # Une augmentation de capacité libère des places pour la liste d'attente
+    if 'max_attendees' in update_data:
+        promote_waitlist(db, [db_event.id])
     
     db.commit()
     db.refresh(db_event)
+    if released_room:
+        room_calendar.release(str(released_room.id), released_room.calendar_version, str(db_event.id))
+    if booked_room:
+        room_calendar.book(str(booked_room.id), booked_room.calendar_version, str(db_event.id),
+                           db_event.start_date, db_event.end_date)
+
+    # Dates, statut ou participants modifiés : les bitmaps des jours concernés sont reconstruits
+    if update_data.keys() & {'start_date', 'end_date', 'status', 'max_attendees'}:
+        availability_index.invalidate(previous_dates[0].date(), previous_dates[1].date())
+        availability_index.invalidate(db_event.start_date.date(), db_event.end_date.date())
     
     # Convert back for response
     if db_event.attendees:
@@ -1322,12 +1660,64 @@ def delete_event(
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    released_room = None
+    if db_event.room_id and db_event.status != EventStatus.cancelled:
+        released_room = release_room(db, db_event.room_id)
+    deleted_event_id = str(db_event.id)
     db.delete(db_event)
     db.commit()
+    if released_room:
+        room_calendar.release(str(released_room.id), released_room.calendar_version, deleted_event_id)
     
     return {"message": "Event deleted successfully"}
 
 # Leave request endpoints
+ACTIVE_LEAVE_STATUSES = [LeaveStatus.pending, LeaveStatus.approved]
+
+def find_overlapping_leave(db: Session, employee_id, start_date: datetime, end_date: datetime,
+                           exclude_leave_id=None):
+    """Demande active (en attente ou approuvée) chevauchant la période : une sonde sur
+    l'index (employee_id, status, start_date, end_date)
+
+    Même convention que la disponibilité (leave_interval) : un congé occupe des
+    journées entières, date de fin incluse ; deux congés qui partagent un jour se
+    chevauchent, quelles que soient les heures saisies.
+    """
+    first_day, after_last_day = leave_interval(start_date, end_date)
+    query = db.query(LeaveRequest.id, LeaveRequest.status, LeaveRequest.start_date, LeaveRequest.end_date).filter(
+        LeaveRequest.employee_id == employee_id,
+        LeaveRequest.status.in_(ACTIVE_LEAVE_STATUSES),
+        LeaveRequest.start_date < after_last_day,
+        LeaveRequest.end_date >= first_day
+    )
+    if exclude_leave_id is not None:
+        query = query.filter(LeaveRequest.id != exclude_leave_id)
+    return query.first()
+
+def validate_leave_dates(db: Session, leave: LeaveRequest):
+    """Cohérence des dates et absence de chevauchement avec une autre demande active"""
+    if leave.end_date < leave.start_date:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
+    if leave.status not in (None, *ACTIVE_LEAVE_STATUSES):
+        return
+    overlap = find_overlapping_leave(db, leave.employee_id, leave.start_date, leave.end_date, leave.id)
+    if overlap:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chevauchement avec une demande {overlap.status.value} "
+                   f"du {overlap.start_date.strftime('%d/%m/%Y')} au {overlap.end_date.strftime('%d/%m/%Y')}"
+        )
+
+def commit_leave(db: Session):
+    """Commit d'une demande de congé ; la contrainte d'exclusion PostgreSQL couvre les écritures concurrentes"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if "ex_leave_requests_no_overlap" in str(e.orig):
+            raise HTTPException(status_code=409, detail="Chevauchement avec une autre demande de congé")
+        raise
+
 @app.get("/api/leaves", response_model=PaginatedResponse)
 def get_leaves(
     page: int = Query(1, ge=1),
@@ -1384,8 +1774,10 @@ def create_leave(
     current_user: Employee = Depends(get_current_user)
 ):
     db_leave = LeaveRequest(**leave.dict())
+    validate_leave_dates(db, db_leave)
+    db_leave.department = db.query(Employee.department).filter(Employee.id == db_leave.employee_id).scalar()
     db.add(db_leave)
-    db.commit()
+    commit_leave(db)
     db.refresh(db_leave)
     
     return ApiResponse(
@@ -1401,15 +1793,20 @@ def update_leave(
     db: Session = Depends(get_db),
     current_user: Employee = Depends(get_current_user)
 ):
-    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
+    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).with_for_update().first()
     if not db_leave:
         raise HTTPException(status_code=404, detail="Leave request not found")
     
+    previous = leave_snapshot(db_leave)
     for field, value in leave.dict(exclude_unset=True).items():
         setattr(db_leave, field, value)
+    if leave_snapshot(db_leave) != previous:
+        validate_leave_dates(db, db_leave)
+    sync_leave_ledger(db, previous, db_leave, created_by=str(current_user.id))
     
-    db.commit()
+    commit_leave(db)
     db.refresh(db_leave)
+    after_leave_change(previous, db_leave)
     
     return ApiResponse(
         data=LeaveRequestResponse.from_orm(db_leave),
@@ -1421,24 +1818,44 @@ def update_leave(
 def approve_leave(
     leave_id: str,
     approved_by: str,
+    override_staffing: bool = False,
     db: Session = Depends(get_db),
     current_user: Employee = Depends(get_current_user)
 ):
-    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
+    # Verrou de ligne : une décision concurrente attend, puis voit le nouveau statut (pas de double écriture au grand livre)
+    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).with_for_update().first()
     if not db_leave:
         raise HTTPException(status_code=404, detail="Leave request not found")
     
+    previous = leave_snapshot(db_leave)
     db_leave.status = LeaveStatus.approved
     db_leave.approved_by = approved_by
     db_leave.manager_approval = True
     db_leave.hr_approval = True
-    
-    db.commit()
+    # Une demande refusée qui revient en jeu ne doit pas chevaucher les demandes actives
+    if previous[0] == LeaveStatus.rejected:
+        validate_leave_dates(db, db_leave)
+
+    message = "Leave request approved successfully"
+    if previous[0] != LeaveStatus.approved:
+        staffing = staffing_checks(db, [
+            (db_leave.id, db_leave.employee.department, db_leave.start_date, db_leave.end_date)
+        ]).get(str(db_leave.id))
+        if staffing and not staffing["ok"]:
+            summary = staffing_shortfall_summary(staffing)
+            if not override_staffing:
+                raise HTTPException(status_code=409, detail=f"Sous-effectif en {staffing['department']} : {summary}")
+            logger.warning(f"Leave {leave_id} approved below minimum staffing by user {current_user.id}: {summary}")
+            message = f"Leave request approved successfully ({summary})"
+    sync_leave_ledger(db, previous, db_leave, created_by=approved_by)
+    
+    commit_leave(db)
     db.refresh(db_leave)
+    after_leave_change(previous, db_leave)
     
     return ApiResponse(
         data=LeaveRequestResponse.from_orm(db_leave),
-        message="Leave request approved successfully",
+        message=message,
         success=True
     )
 
@@ -1449,16 +1866,19 @@ def reject_leave(
     db: Session = Depends(get_db),
     current_user: Employee = Depends(get_current_user)
 ):
-    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
+    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).with_for_update().first()
     if not db_leave:
         raise HTTPException(status_code=404, detail="Leave request not found")
     
+    previous = leave_snapshot(db_leave)
     db_leave.status = LeaveStatus.rejected
     db_leave.rejection_reason = rejection_data.get("rejectionReason")
     db_leave.approved_by = rejection_data.get("rejectedBy")
+    sync_leave_ledger(db, previous, db_leave, created_by=rejection_data.get("rejectedBy"))
     
     db.commit()
     db.refresh(db_leave)
+    after_leave_change(previous, db_leave)
     
     return ApiResponse(
         data=LeaveRequestResponse.from_orm(db_leave),
@@ -1472,12 +1892,15 @@ def delete_leave(
     db: Session = Depends(get_db),
     current_user: Employee = Depends(get_current_user)
 ):
-    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
+    db_leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).with_for_update().first()
     if not db_leave:
         raise HTTPException(status_code=404, detail="Leave request not found")
     
+    previous = leave_snapshot(db_leave)
+    sync_leave_ledger(db, previous, db_leave, deleted=True, created_by=str(current_user.id))
     db.delete(db_leave)
     db.commit()
+    after_leave_change(previous, None)
     
     return {"message": "Leave request deleted successfully"}
 
@@ -1887,6 +2310,155 @@ def create_notification(
         success=True
     )
 
+# Attendance rollups
+def attendance_change(deltas: Counter, event_id, employee_id, old_status: Optional[str], new_status: Optional[str]):
+    """Ajoute au compteur de variations le passage d'une fiche de old_status à new_status (None : création / suppression)"""
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        deltas[(str(event_id), str(employee_id), old_status)] -= 1
+    if new_status is not None:
+        deltas[(str(event_id), str(employee_id), new_status)] += 1
+
+def attendance_status_snapshot(db: Session, event_id) -> Counter:
+    """Fiches d'un événement par (employé, statut), pour calculer les variations d'un UPDATE groupé"""
+    return Counter({
+        (str(event_id), str(employee_id), status): count
+        for employee_id, status, count in db.query(
+            Attendance.employee_id, Attendance.status, func.count(Attendance.id)
+        ).filter(Attendance.event_id == event_id).group_by(Attendance.employee_id, Attendance.status)
+    })
+
+def upsert_rollup_counts(db: Session, model, index_elements: List[str], rows: List[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count"""
+    if not rows:
+        return
+    statement = dialect_insert(db, model).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={"count": model.count + statement.excluded.count}
+    ))
+
+def upsert_group_rollups(db: Session, group_deltas: Counter):
+    """Report des variations (département, type d'événement, mois, statut) -> ±n dans attendance_rollups"""
+    upsert_rollup_counts(db, AttendanceRollup, ["department", "event_type", "month", "status"], [
+        {"id": uuid4(), "department": department, "event_type": event_type, "month": month, "status": status, "count": delta}
+        for (department, event_type, month, status), delta in sorted(group_deltas.items()) if delta
+    ])
+
+def record_attendance_changes(db: Session, deltas: Counter):
+    """Report des variations (event_id, employee_id, statut) -> ±n dans les tables de cumul
+
+    Deux requêtes (événements, départements des employés) puis un upsert par table,
+    dans la transaction de l'appelant. Le département retenu est celui de l'employé au
+    moment du changement ; une reconstruction réaligne les cumuls après une mutation.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    event_ids = {event_id for event_id, _, _ in deltas}
+    employee_ids = {employee_id for _, employee_id, _ in deltas}
+    events = {
+        str(event_id): (event_type, date(start_date.year, start_date.month, 1))
+        for event_id, event_type, start_date in db.query(Event.id, Event.type, Event.start_date).filter(Event.id.in_(event_ids))
+    }
+    departments = {
+        str(employee_id): department
+        for employee_id, department in db.query(Employee.id, Employee.department).filter(Employee.id.in_(employee_ids))
+    }
+
+    group_deltas: Counter = Counter()
+    employee_deltas: Counter = Counter()
+    for (event_id, employee_id, status), delta in deltas.items():
+        if event_id not in events or employee_id not in departments:
+            continue
+        event_type, month = events[event_id]
+        group_deltas[(departments[employee_id], event_type, month, status)] += delta
+        employee_deltas[(employee_id, status)] += delta
+
+    upsert_group_rollups(db, group_deltas)
+    upsert_rollup_counts(db, EmployeeAttendanceRollup, ["employee_id", "status"], [
+        {"id": uuid4(), "employee_id": uuid.UUID(employee_id), "status": status, "count": delta}
+        for (employee_id, status), delta in sorted(employee_deltas.items()) if delta
+    ])
+
+def event_rollup_key(event: Event) -> tuple:
+    """Clé de cumul d'un événement : (type, premier jour du mois de début)"""
+    return EventType(event.type), date(event.start_date.year, event.start_date.month, 1)
+
+def move_event_attendance_rollups(db: Session, event_id, previous: tuple, current: tuple):
+    """Report des fiches d'un événement de l'ancienne clé (type, mois) vers la nouvelle, dans la transaction de l'appelant"""
+    if previous == current:
+        return
+    group_deltas: Counter = Counter()
+    for department, status, count in db.query(
+        Employee.department, Attendance.status, func.count(Attendance.id)
+    ).join(Employee, Employee.id == Attendance.employee_id).filter(
+        Attendance.event_id == event_id
+    ).group_by(Employee.department, Attendance.status):
+        group_deltas[(department, *previous, status)] -= count
+        group_deltas[(department, *current, status)] += count
+    upsert_group_rollups(db, group_deltas)
+
+def rebuild_attendance_rollups(db: Session) -> dict:
+    """Reconstruction complète des tables de cumul à partir des fiches de présence (deux GROUP BY)"""
+    groups = db.query(
+        Employee.department, Event.type, extract("year", Event.start_date), extract("month", Event.start_date),
+        Attendance.status, func.count(Attendance.id)
+    ).join(Event, Event.id == Attendance.event_id).join(Employee, Employee.id == Attendance.employee_id).group_by(
+        Employee.department, Event.type, extract("year", Event.start_date), extract("month", Event.start_date),
+        Attendance.status
+    ).all()
+    employees = db.query(Attendance.employee_id, Attendance.status, func.count(Attendance.id)).group_by(
+        Attendance.employee_id, Attendance.status
+    ).all()
+
+    db.query(AttendanceRollup).delete(synchronize_session=False)
+    db.query(EmployeeAttendanceRollup).delete(synchronize_session=False)
+    if groups:
+        db.execute(insert(AttendanceRollup), [
+            {"id": uuid4(), "department": department, "event_type": event_type,
+             "month": date(int(year), int(month), 1), "status": status, "count": count}
+            for department, event_type, year, month, status, count in groups
+        ])
+    if employees:
+        db.execute(insert(EmployeeAttendanceRollup), [
+            {"id": uuid4(), "employee_id": employee_id, "status": status, "count": count}
+            for employee_id, status, count in employees
+        ])
+    db.commit()
+
+    return {"groups": len(groups), "employees": len(employees)}
+
+ATTENDANCE_ROLLUPS_BACKFILL_JOB = "attendance_rollups_backfill"
+
+def backfill_attendance_rollups() -> Optional[dict]:
+    """Remplissage initial des tables de cumul au démarrage (session dédiée)
+
+    Les tables créées vides au déploiement sont reconstruites à partir des fiches
+    existantes, sinon chaque décrément d'une fiche antérieure ferait passer les cumuls
+    sous leur valeur réelle. Sans effet si les cumuls sont déjà remplis ; la ligne du
+    traitement dans job_watermarks sérialise les processus qui démarrent ensemble.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            dialect_insert(db, JobWatermark)
+            .values(name=ATTENDANCE_ROLLUPS_BACKFILL_JOB, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        db.query(JobWatermark).filter(JobWatermark.name == ATTENDANCE_ROLLUPS_BACKFILL_JOB).with_for_update().one()
+        if (db.query(AttendanceRollup.id).first() or db.query(EmployeeAttendanceRollup.id).first()
+                or not db.query(Attendance.id).first()):
+            db.commit()
+            return None
+        return rebuild_attendance_rollups(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 # Attendance endpoints
 @app.get("/api/attendance", response_model=PaginatedResponse)
 def get_attendance(
@@ -1934,37 +2506,84 @@ def get_attendance_by_id(
         success=True
     )
 
+def attendance_stats_values(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Statistiques de présence à partir des effectifs par statut"""
+    total_registered = sum(counts.values())
+    total_present = counts.get("present", 0)
+    total_late = counts.get("late", 0)
+    
+    attendance_rate = (total_present / total_registered * 100) if total_registered > 0 else 0
+    late_rate = (total_late / total_registered * 100) if total_registered > 0 else 0
+    
+    return {
+        "total_registered": total_registered,
+        "total_present": total_present,
+        "total_absent": counts.get("absent", 0),
+        "total_late": total_late,
+        "attendance_rate": round(attendance_rate, 1),
+        "late_rate": round(late_rate, 1),
+    }
+
 @app.get("/api/attendance/stats/{event_id}", response_model=ApiResponse)
 def get_attendance_stats(
     event_id: str,
     db: Session = Depends(get_db),
     current_user: Employee = Depends(get_current_user)
 ):
-    attendance_records = db.query(Attendance).filter(Attendance.event_id == event_id).all()
-    
-    total_registered = len(attendance_records)
-    total_present = len([att for att in attendance_records if att.status == "present"])
-    total_absent = len([att for att in attendance_records if att.status == "absent"])
-    total_late = len([att for att in attendance_records if att.status == "late"])
-    
-    attendance_rate = (total_present / total_registered * 100) if total_registered > 0 else 0
-    late_rate = (total_late / total_registered * 100) if total_registered > 0 else 0
-    
-    stats = AttendanceStats(
-        total_registered=total_registered,
-        total_present=total_present,
-        total_absent=total_absent,
-        total_late=total_late,
-        attendance_rate=round(attendance_rate, 1),
-        late_rate=round(late_rate, 1)
-    )
+    counts = dict(db.query(Attendance.status, func.count(Attendance.id)).filter(
+        Attendance.event_id == event_id
+    ).group_by(Attendance.status).all())
     
     return ApiResponse(
-        data=stats,
+        data=AttendanceStats(**attendance_stats_values(counts)),
         message="Attendance stats retrieved successfully",
         success=True
     )
 
+@app.post("/api/attendance/stats/batch", response_model=ApiResponse[List[EventAttendanceStats]])
+def get_attendance_stats_batch(
+    request: AttendanceStatsBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    """Statistiques de présence de plusieurs événements (liste ou période) en une requête groupée"""
+    if not request.event_ids and not (request.start and request.end):
+        raise HTTPException(status_code=400, detail="Liste d'événements ou période requise")
+    if request.start and request.end and request.end < request.start:
+        raise HTTPException(status_code=400, detail="La fin doit être postérieure au début")
+
+    query = db.query(
+        Event.id, Event.title, Event.start_date, Attendance.status, func.count(Attendance.id)
+    ).outerjoin(Attendance, Attendance.event_id == Event.id)
+    if request.event_ids:
+        query = query.filter(Event.id.in_(request.event_ids))
+    if request.start:
+        query = query.filter(Event.start_date >= request.start)
+    if request.end:
+        query = query.filter(Event.start_date < request.end)
+    rows = query.group_by(Event.id, Event.title, Event.start_date, Attendance.status).all()
+
+    events: Dict[str, dict] = {}
+    for event_id, title, start_date, status, count in rows:
+        event = events.setdefault(str(event_id), {"title": title, "start_date": start_date, "counts": {}})
+        if status is not None:
+            event["counts"][status] = count
+
+    stats = [
+        EventAttendanceStats(
+            event_id=event_id,
+            title=event["title"],
+            start_date=event["start_date"],
+            **attendance_stats_values(event["counts"])
+        )
+        for event_id, event in sorted(events.items(), key=lambda item: item[1]["start_date"])
+    ]
+    return ApiResponse(
+        success=True,
+        message=f"Statistiques de {len(stats)} événement(s)",
+        data=stats
+    )
+
 @app.post("/api/attendance/register", response_model=ApiResponse)
 def register_for_event(
     registration: AttendanceCreate,
@@ -1982,6 +2601,9 @@ def register_for_event(
     
     db_attendance = Attendance(**registration.dict())
     db.add(db_attendance)
+    deltas = Counter()
+    attendance_change(deltas, registration.event_id, registration.employee_id, None, db_attendance.status or "registered")
+    record_attendance_changes(db, deltas)
     db.commit()
     db.refresh(db_attendance)
     
@@ -2002,8 +2624,11 @@ def check_in_attendance(
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     
+    deltas = Counter()
+    attendance_change(deltas, attendance.event_id, attendance.employee_id, attendance.status, "present")
     attendance.check_in = datetime.fromisoformat(check_in_data["checkInTime"])
     attendance.status = "present"
+    record_attendance_changes(db, deltas)
     db.commit()
     db.refresh(attendance)
     
@@ -2045,8 +2670,12 @@ def update_attendance_status(
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     
+    previous_status = attendance.status
     for field, value in status_update.dict(exclude_unset=True).items():
         setattr(attendance, field, value)
+    deltas = Counter()
+    attendance_change(deltas, attendance.event_id, attendance.employee_id, previous_status, attendance.status)
+    record_attendance_changes(db, deltas)
     
     db.commit()
     db.refresh(attendance)
@@ -2067,11 +2696,478 @@ def delete_attendance(
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     
+    deltas = Counter()
+    attendance_change(deltas, attendance.event_id, attendance.employee_id, attendance.status, None)
+    record_attendance_changes(db, deltas)
     db.delete(attendance)
     db.commit()
     
     return {"message": "Attendance record deleted successfully"}
 
+class AttendanceScan(BaseModel):
+    attendance_id: Optional[str] = None
+    confirmation_code: Optional[str] = None
+    action: str = Field("checkin", pattern="^(checkin|checkout)$")
+    timestamp: datetime
+
+class BulkAttendanceScanRequest(BaseModel):
+    scans: List[AttendanceScan] = Field(..., min_length=1, max_length=5000)
+
+def is_valid_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+@app.post("/api/attendance/bulk-checkin")
+def bulk_check_in(
+    request: BulkAttendanceScanRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Pointages groupés (entrées et sorties) des bornes et lecteurs de badges, en une transaction
+
+    Les pointages sont résolus en deux requêtes (codes de confirmation, fiches de présence)
+    puis écrits par un INSERT et un UPDATE groupés : une borne hors ligne vide sa file
+    d'attente en un appel. Les pointages d'une même fiche sont appliqués dans l'ordre
+    chronologique (première entrée, dernière sortie) ; chacun reçoit son propre résultat.
+    Un code de confirmation sans fiche de présence en crée une.
+    """
+    if current_user.role not in ["manager", "hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    codes = {scan.confirmation_code for scan in request.scans if not scan.attendance_id and scan.confirmation_code}
+    registrations = {}
+    if codes:
+        registrations = {
+            row.confirmation_code: row
+            for row in db.query(
+                EventRegistration.confirmation_code, EventRegistration.event_id, EventRegistration.employee_id
+            ).filter(
+                EventRegistration.confirmation_code.in_(codes),
+                EventRegistration.status == "confirmed"
+            )
+        }
+
+    attendance_ids = {scan.attendance_id for scan in request.scans if scan.attendance_id and is_valid_uuid(scan.attendance_id)}
+    conditions = []
+    if attendance_ids:
+        conditions.append(Attendance.id.in_(attendance_ids))
+    if registrations:
+        conditions.append(and_(
+            Attendance.event_id.in_({row.event_id for row in registrations.values()}),
+            Attendance.employee_id.in_({row.employee_id for row in registrations.values()})
+        ))
+
+    # État courant des fiches concernées, modifié en mémoire au fil des pointages
+    records: Dict[str, dict] = {}
+    record_by_pair: Dict[tuple, dict] = {}
+    original_status: Dict[str, str] = {}
+    if conditions:
+        for row in db.query(
+            Attendance.id, Attendance.event_id, Attendance.employee_id,
+            Attendance.check_in, Attendance.check_out, Attendance.status
+        ).filter(or_(*conditions)):
+            record = {"id": row.id, "event_id": row.event_id, "employee_id": row.employee_id,
+                      "check_in": row.check_in, "check_out": row.check_out, "status": row.status}
+            records[str(row.id)] = record
+            record_by_pair[(str(row.event_id), str(row.employee_id))] = record
+            original_status[str(row.id)] = row.status
+
+    now = datetime.utcnow()
+    created: Dict[str, dict] = {}
+    changed: set = set()
+    results: List[Optional[dict]] = [None] * len(request.scans)
+
+    # Horodatages ramenés en UTC naïf, comme les colonnes DateTime
+    timestamps = [
+        scan.timestamp.astimezone(timezone.utc).replace(tzinfo=None) if scan.timestamp.tzinfo else scan.timestamp
+        for scan in request.scans
+    ]
+    for index in sorted(range(len(request.scans)), key=lambda index: timestamps[index]):
+        scan = request.scans[index]
+        timestamp = timestamps[index]
+        if scan.attendance_id:
+            record = records.get(str(scan.attendance_id))
+        else:
+            registration = registrations.get(scan.confirmation_code)
+            pair = (str(registration.event_id), str(registration.employee_id)) if registration else None
+            record = record_by_pair.get(pair) if pair else None
+            if registration and record is None:
+                record = {"id": uuid4(), "event_id": registration.event_id, "employee_id": registration.employee_id,
+                          "check_in": None, "check_out": None, "status": "registered"}
+                records[str(record["id"])] = record_by_pair[pair] = created[str(record["id"])] = record
+
+        result = {"index": index, "action": scan.action, "attendance_id": str(record["id"]) if record else None}
+        if record is None:
+            results[index] = {**result, "success": False, "result": "not_found"}
+            continue
+
+        if scan.action == "checkin":
+            if record["check_in"] is not None and record["check_in"] <= timestamp:
+                results[index] = {**result, "success": True, "result": "already_checked_in"}
+                continue
+            record["check_in"] = timestamp
+            if record["status"] not in ["present", "late"]:
+                record["status"] = "present"
+            results[index] = {**result, "success": True, "result": "checked_in"}
+        else:
+            if record["check_in"] is None:
+                results[index] = {**result, "success": False, "result": "not_checked_in"}
+                continue
+            if timestamp < record["check_in"]:
+                results[index] = {**result, "success": False, "result": "checkout_before_checkin"}
+                continue
+            if record["check_out"] is None or timestamp > record["check_out"]:
+                record["check_out"] = timestamp
+            results[index] = {**result, "success": True, "result": "checked_out"}
+        changed.add(str(record["id"]))
+
+    new_rows = [
+        {**record, "created_at": now, "updated_at": now}
+        for attendance_id, record in created.items() if attendance_id in changed
+    ]
+    updated_rows = [
+        {"id": record["id"], "check_in": record["check_in"], "check_out": record["check_out"],
+         "status": record["status"], "updated_at": now}
+        for attendance_id, record in records.items() if attendance_id in changed and attendance_id not in created
+    ]
+    if new_rows:
+        db.execute(insert(Attendance), new_rows)
+    if updated_rows:
+        db.execute(update(Attendance), updated_rows)
+    deltas = Counter()
+    for attendance_id in changed:
+        record = records[attendance_id]
+        attendance_change(deltas, record["event_id"], record["employee_id"], original_status.get(attendance_id), record["status"])
+    record_attendance_changes(db, deltas)
+    db.commit()
+
+    failed = sum(1 for result in results if not result["success"])
+    logger.info(f"Bulk check-in: {len(request.scans)} scan(s), {len(new_rows) + len(updated_rows)} record(s) "
+                f"written, {failed} failed, by user {current_user.id}")
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(request.scans) - failed} pointage(s) traité(s), {failed} en échec",
+        data={"results": results}
+    )
+
+def ingest_badge_taps(db: Session, stream, chunk_size: int = 5000, progress=None) -> IngestReport:
+    """Import en flux d'un export CSV de lecteurs de badges dans les fiches de présence
+
+    Les badges sont résolus par un dictionnaire chargé une fois. Pour chaque paquet,
+    les événements de la période couverte et leurs participants (fiches de présence
+    ou inscriptions confirmées) sont chargés, les pointages réduits à une première
+    et une dernière badgeuse par (événement, employé), puis fusionnés en base par un
+    INSERT et un UPDATE groupés. Chaque paquet est validé séparément : un import
+    interrompu peut être relancé sans double comptage.
+    """
+    report = IngestReport()
+    grace = timedelta(minutes=config.ATTENDANCE_GRACE_MINUTES)
+    employee_by_badge = {
+        badge_id: str(employee_id)
+        for badge_id, employee_id in db.query(Employee.badge_id, Employee.id).filter(Employee.badge_id != None)
+    }
+
+    for taps in read_badge_taps(stream, report, chunk_size):
+        report.chunks += 1
+        first_tap = min(timestamp for _, timestamp, _ in taps)
+        last_tap = max(timestamp for _, timestamp, _ in taps)
+        employee_ids = {employee_by_badge[badge_id] for badge_id, _, _ in taps if badge_id in employee_by_badge}
+
+        events = {
+            str(row.id): row
+            for row in db.query(Event.id, Event.start_date, Event.end_date).filter(
+                Event.status != EventStatus.cancelled,
+                Event.start_date <= last_tap + EARLY_ARRIVAL,
+                Event.end_date >= first_tap - LATE_DEPARTURE
+            )
+        } if employee_ids else {}
+
+        # Participants : fiche de présence existante ou inscription confirmée
+        existing: Dict[tuple, Any] = {}
+        participants: set = set()
+        if events:
+            for row in db.query(
+                Attendance.id, Attendance.event_id, Attendance.employee_id, Attendance.check_in, Attendance.check_out,
+                Attendance.status
+            ).filter(Attendance.event_id.in_(events.keys()), Attendance.employee_id.in_(employee_ids)):
+                existing[(str(row.event_id), str(row.employee_id))] = row
+            participants = set(existing) | {
+                (str(event_id), str(employee_id))
+                for event_id, employee_id in db.query(EventRegistration.event_id, EventRegistration.employee_id).filter(
+                    EventRegistration.event_id.in_(events.keys()),
+                    EventRegistration.employee_id.in_(employee_ids),
+                    EventRegistration.status == "confirmed"
+                )
+            }
+
+        windows_by_employee: Dict[str, list] = {}
+        for event_id, employee_id in participants:
+            event = events[event_id]
+            windows_by_employee.setdefault(employee_id, []).append((event.start_date, event.end_date, event_id))
+
+        now = datetime.utcnow()
+        new_rows, updated_rows = [], []
+        deltas = Counter()
+        for (event_id, employee_id), (first, last) in match_taps(taps, employee_by_badge, windows_by_employee, report).items():
+            record = existing.get((event_id, employee_id))
+            check_in, check_out = merge_span(record.check_in if record else None,
+                                             record.check_out if record else None, first, last)
+            event = events[event_id]
+            status = derive_attendance_status(check_in, check_out, event.start_date, event.end_date, grace)
+            attendance_change(deltas, event_id, employee_id, record.status if record else None, status)
+            if record:
+                updated_rows.append({"id": record.id, "check_in": check_in, "check_out": check_out,
+                                     "status": status, "updated_at": now})
+            else:
+                new_rows.append({"id": uuid4(), "event_id": event.id, "employee_id": uuid.UUID(employee_id),
+                                 "check_in": check_in, "check_out": check_out, "status": status,
+                                 "created_at": now, "updated_at": now})
+
+        if new_rows:
+            db.execute(insert(Attendance), new_rows)
+        if updated_rows:
+            db.execute(update(Attendance), updated_rows)
+        record_attendance_changes(db, deltas)
+        db.commit()
+        report.inserted += len(new_rows)
+        report.updated += len(updated_rows)
+        if progress:
+            progress(report)
+
+    return report
+
+# Attendance finalization
+ATTENDANCE_FINALIZATION_JOB = "attendance_finalization"
+
+def finalize_ended_events(db: Session, now: Optional[datetime] = None, batch_size: int = 500) -> dict:
+    """Classement des fiches de présence des événements terminés et pas encore finalisés
+
+    Les événements sont choisis sur attendance_finalized_at IS NULL (index partiel) :
+    un événement créé après coup ou dont la fin est avancée dans le passé est traité
+    au passage suivant. La ligne du traitement dans job_watermarks est verrouillée le
+    temps de la transaction : chaque événement est traité une seule fois, même avec
+    plusieurs processus. Pour chacun, un seul UPDATE classe toutes les fiches d'après
+    check_in et check_out (mêmes règles que derive_attendance_status) ; une fiche sans
+    pointage dont le statut a été saisi à la main est conservée.
+    """
+    now = now or datetime.utcnow()
+    grace = timedelta(minutes=config.ATTENDANCE_GRACE_MINUTES)
+
+    # Création idempotente de la ligne du traitement : deux premiers passages concurrents ne se heurtent pas
+    db.execute(
+        dialect_insert(db, JobWatermark)
+        .values(name=ATTENDANCE_FINALIZATION_JOB, updated_at=now)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    job = db.query(JobWatermark).filter(JobWatermark.name == ATTENDANCE_FINALIZATION_JOB).with_for_update().one()
+
+    events = db.query(Event.id, Event.start_date, Event.end_date).filter(
+        Event.attendance_finalized_at == None,
+        Event.end_date <= now,
+        Event.status != EventStatus.cancelled
+    ).order_by(Event.end_date, Event.id).limit(batch_size).all()
+
+    updated = 0
+    finalized = []
+    deltas = Counter()
+    for event in events:
+        before = attendance_status_snapshot(db, event.id)
+        result = db.execute(
+            update(Attendance).where(
+                Attendance.event_id == event.id,
+                or_(Attendance.check_in != None, Attendance.status == "registered")
+            ).values(
+                status=case(
+                    (Attendance.check_in == None, "absent"),
+                    (Attendance.check_in > event.start_date + grace, "late"),
+                    (and_(Attendance.check_out != None, Attendance.check_out < event.end_date - grace), "left_early"),
+                    else_="present"
+                ),
+                updated_at=now
+            ).execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        finalized.append(str(event.id))
+        if result.rowcount:
+            deltas.update(attendance_status_snapshot(db, event.id))
+            deltas.subtract(before)
+    record_attendance_changes(db, deltas)
+
+    if events:
+        db.execute(
+            update(Event)
+            .where(Event.id.in_([event.id for event in events]))
+            .values(attendance_finalized_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        # Dernier événement traité, à titre de suivi
+        job.watermark = events[-1].end_date
+        job.watermark_key = str(events[-1].id)
+    db.commit()
+
+    return {
+        "events": finalized,
+        "updated": updated,
+        "watermark": job.watermark,
+        "has_more": len(events) == batch_size
+    }
+
+def run_attendance_finalization() -> int:
+    """Passages successifs jusqu'à épuisement des événements terminés (session dédiée)"""
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            result = finalize_ended_events(db)
+            total += len(result["events"])
+            if not result["has_more"]:
+                return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def attendance_finalization_loop(interval_seconds: int):
+    """Tâche de fond : finalisation périodique, hors de la boucle d'événements"""
+    while True:
+        try:
+            finalized = await asyncio.to_thread(run_attendance_finalization)
+            if finalized:
+                logger.info(f"Attendance finalization: {finalized} event(s) finalized")
+        except Exception as e:
+            logger.error(f"Erreur lors de la finalisation des présences: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+@app.post("/api/attendance/finalize")
+def finalize_attendance(
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Finalisation immédiate des présences des événements terminés (sans attendre la tâche de fond)"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    result = finalize_ended_events(db)
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(result['events'])} événement(s) finalisé(s), {result['updated']} fiche(s) classée(s)",
+        data=result
+    )
+
+@app.post("/api/attendance-rollups/rebuild")
+def rebuild_attendance_rollups_endpoint(
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Reconstruction des tables de cumul de présence (après une mutation de département, un import direct...)"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    result = rebuild_attendance_rollups(db)
+
+    return ApiResponse(
+        success=True,
+        message=f"{result['groups']} cumul(s) par groupe, {result['employees']} par employé reconstruit(s)",
+        data=result
+    )
+
+@app.get("/api/attendance-rollups")
+def get_attendance_rollups(
+    group_by: str = Query("department", pattern="^(department|event_type|month|employee)$"),
+    department: Optional[str] = None,
+    event_type: Optional[EventType] = None,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Taux de présence par département, type d'événement, mois ou employé, lus dans les tables de cumul
+
+    Le regroupement par employé ne porte que sur les cumuls par employé (filtre de
+    département seulement).
+    """
+    if current_user.role not in ["manager", "hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    if current_user.role == "manager":
+        if department and department != current_user.department:
+            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        department = current_user.department
+
+    if group_by == "employee":
+        query = db.query(
+            EmployeeAttendanceRollup.employee_id, Employee.name, EmployeeAttendanceRollup.status,
+            EmployeeAttendanceRollup.count
+        ).join(Employee, Employee.id == EmployeeAttendanceRollup.employee_id)
+        if department:
+            query = query.filter(Employee.department == department)
+        rows = [((str(employee_id), name), status, count) for employee_id, name, status, count in query]
+    else:
+        dimension = {
+            "department": AttendanceRollup.department,
+            "event_type": AttendanceRollup.event_type,
+            "month": AttendanceRollup.month,
+        }[group_by]
+        query = db.query(dimension, AttendanceRollup.status, func.sum(AttendanceRollup.count))
+        if department:
+            query = query.filter(AttendanceRollup.department == department)
+        if event_type:
+            query = query.filter(AttendanceRollup.event_type == event_type)
+        if start_month:
+            query = query.filter(AttendanceRollup.month >= start_month.replace(day=1))
+        if end_month:
+            query = query.filter(AttendanceRollup.month <= end_month.replace(day=1))
+        rows = query.group_by(dimension, AttendanceRollup.status).all()
+
+    groups: Dict[Any, Dict[str, int]] = {}
+    for key, status, count in rows:
+        groups.setdefault(key, {})[status] = int(count or 0)
+
+    data = []
+    for key in sorted(groups, key=str):
+        item = {"employee_id": key[0], "employee_name": key[1]} if group_by == "employee" else {group_by: key}
+        data.append({**item, "by_status": groups[key], **attendance_stats_values(groups[key])})
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(data)} groupe(s)",
+        data=data
+    )
+
+@app.post("/api/attendance/ingest")
+def ingest_attendance_file(
+    file: UploadFile = File(...),
+    chunk_size: int = Query(5000, ge=100, le=50000),
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Import d'un export CSV des lecteurs de badges (colonnes badge_id et timestamp)"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        report = ingest_badge_taps(db, stream, chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        stream.detach()
+
+    logger.info(f"Badge file {file.filename} ingested by user {current_user.id}: "
+                f"{report.rows} row(s), {report.inserted} inserted, {report.updated} updated, "
+                f"{report.error_count} error(s)")
+
+    return ApiResponse(
+        success=True,
+        message=f"{report.rows} ligne(s) lue(s), {report.inserted + report.updated} fiche(s) de présence mise(s) à jour",
+        data=report.to_dict()
+    )
+
 # Event Registration Models
 class EventRegistrationBase(BaseModel):
     event_id: str
@@ -2094,12 +3190,64 @@ class EventRegistrationResponse(EventRegistrationBase):
     registration_date: datetime
     status: str
     confirmation_code: Optional[str] = None
+    confirmed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+class EventSummary(BaseModel):
+    id: str
+    title: str
+    type: EventType
+    start_date: datetime
+    end_date: datetime
+    location: str
+    status: EventStatus
+
+class EmployeeRegistrationResponse(BaseModel):
+    id: str
+    event_id: str
+    employee_id: str
+    status: str
+    registration_date: datetime
+    confirmation_code: Optional[str] = None
+    confirmed_at: Optional[datetime] = None
+    notes: Optional[str] = None
+    event: EventSummary
+
+class EventRegistrationListItem(BaseModel):
+    id: str
+    event_id: str
+    employee_id: str
+    employee_name: str
+    employee_department: str
+    employee_email: str
+    status: str
+    registration_date: datetime
+    confirmation_code: Optional[str] = None
+    confirmed_at: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class EventRegistrationListResponse(PaginatedResponse):
+    data: List[EventRegistrationListItem]
+
+class CheckInLookupResponse(BaseModel):
+    registration_id: str
+    status: str
+    confirmed_at: Optional[datetime] = None
+    employee_id: str
+    employee_name: str
+    department: str
+    event: EventSummary
+
+class ConfirmationRequest(BaseModel):
+    confirmation_code: str = Field(..., alias="confirmationCode", min_length=1)
+
+    class Config:
+        populate_by_name = True
+
 class RegistrationConflictBase(BaseModel):
     event_id: str
     employee_id: str
@@ -2128,6 +3276,22 @@ class EventCapacity(BaseModel):
     waitlist_size: int = 0
     registration_deadline: Optional[datetime] = None
     cancellation_deadline: Optional[datetime] = None
+    fill_rate: Optional[float] = None  # Pourcentage, None si capacité illimitée
+
+class CapacityBatchRequest(BaseModel):
+    event_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+def event_capacity(event_id: str, max_attendees: Optional[int], confirmed_count: int,
+                   waitlist_count: int, cancellation_deadline: Optional[datetime]) -> EventCapacity:
+    return EventCapacity(
+        event_id=event_id,
+        max_attendees=max_attendees or 0,
+        current_attendees=confirmed_count,
+        waitlist_enabled=True,
+        waitlist_size=waitlist_count,
+        cancellation_deadline=cancellation_deadline,
+        fill_rate=round(confirmed_count / max_attendees * 100, 1) if max_attendees else None
+    )
 
 class RegistrationRequest(BaseModel):
     event_id: str
@@ -2136,8 +3300,26 @@ class RegistrationRequest(BaseModel):
     notes: Optional[str] = None
     emergency_contact: Optional[dict] = None
 
-class RegistrationResponse(BaseModel):
-    success: bool
+class BulkCancellationRequest(BaseModel):
+    registration_ids: List[str] = Field(..., min_length=1, max_length=5000)
+
+class BulkRegistrationRequest(BaseModel):
+    event_id: str
+    employee_ids: List[str] = Field(default_factory=list, max_length=5000)
+    department: Optional[str] = None
+    ignore_conflicts: bool = False
+    notes: Optional[str] = None
+
+class BulkRegistrationResult(BaseModel):
+    employee_id: str
+    employee_name: Optional[str] = None
+    status: str  # confirmed, waitlist, conflict, already_registered, not_found
+    registration_id: Optional[str] = None
+    confirmation_code: Optional[str] = None
+    conflicts: List[str] = []
+
+class RegistrationResponse(BaseModel):
+    success: bool
     registration_id: Optional[str] = None
     status: str
     message: str
@@ -2162,8 +3344,9 @@ def validate_registration_data(data: dict) -> bool:
 
 # Event Registration Endpoints
 @app.post("/api/event-registrations/register", response_model=ApiResponse[RegistrationResponse])
-async def register_for_event(
+def register_for_event(
     request: RegistrationRequest,
+    http_request: Request,
     current_user: Employee = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -2191,43 +3374,26 @@ async def register_for_event(
             )
         )
     
-    # Vérification de la capacité
-    event = db.query(Event).filter(Event.id == request.event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Événement non trouvé")
-    
-    current_registrations = db.query(EventRegistration).filter(
-        EventRegistration.event_id == request.event_id,
-        EventRegistration.status == "confirmed"
-    ).count()
-    
-    if event.max_attendees and current_registrations >= event.max_attendees:
-        # Ajouter à la liste d'attente
-        status = "waitlist"
-        message = "Événement complet, ajouté à la liste d'attente"
-    else:
-        status = "confirmed"
-        message = "Inscription confirmée"
-    
-    # Génération du code de confirmation sécurisé
-    confirmation_code = secrets.token_urlsafe(8)
-    
-    # Création de l'inscription
-    registration = EventRegistration(
+    # Réservation atomique de la place et création de l'inscription
+    registration = create_event_registration(
+        db,
         event_id=request.event_id,
         employee_id=request.employee_id,
-        status=status,
-        confirmation_code=confirmation_code,
-        ip_address=request.client.host if hasattr(request, 'client') else None,
         notes=request.notes,
-        emergency_contact_name=request.emergency_contact.get('name') if request.emergency_contact else None,
-        emergency_contact_phone=request.emergency_contact.get('phone') if request.emergency_contact else None,
-        emergency_contact_relationship=request.emergency_contact.get('relationship') if request.emergency_contact else None,
+        emergency_contact=request.emergency_contact,
+        ip_address=http_request.client.host if http_request.client else None,
     )
-    
-    db.add(registration)
-    db.commit()
-    db.refresh(registration)
+    if registration is None:
+        raise HTTPException(status_code=404, detail="Événement non trouvé")
+
+    status = registration.status
+    confirmation_code = registration.confirmation_code
+    if status == "confirmed":
+        mark_event_attendees_busy(db, request.event_id, [request.employee_id])
+    if status == "waitlist":
+        message = "Événement complet, ajouté à la liste d'attente"
+    else:
+        message = "Inscription confirmée"
     
     # Audit trail de sécurité
     logger.info(f"Registration created: {registration.id} for event {request.event_id} by employee {request.employee_id}")
@@ -2246,14 +3412,17 @@ async def register_for_event(
     )
 
 @app.post("/api/event-registrations/{registration_id}/cancel")
-async def cancel_registration(
+def cancel_registration(
     registration_id: str,
     current_user: Employee = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Annulation sécurisée d'une inscription"""
     
-    registration = db.query(EventRegistration).filter(EventRegistration.id == registration_id).first()
+    # Verrou de ligne : deux annulations concurrentes ne libèrent pas deux fois la même place
+    registration = db.query(EventRegistration).filter(
+        EventRegistration.id == registration_id
+    ).with_for_update().first()
     if not registration:
         raise HTTPException(status_code=404, detail="Inscription non trouvée")
     
@@ -2268,59 +3437,442 @@ async def cancel_registration(
         if datetime.utcnow() > event.cancellation_deadline:
             raise HTTPException(status_code=400, detail="Délai d'annulation dépassé")
     
+    if registration.status == "cancelled":
+        raise HTTPException(status_code=400, detail="Inscription déjà annulée")
+
+    previous_status = registration.status
+    adjust_event_counters(db, registration.event_id, old_status=previous_status, new_status="cancelled")
     registration.status = "cancelled"
     registration.updated_at = datetime.utcnow()
+    db.flush()
+
+    # Une place confirmée libérée profite au plus ancien inscrit en liste d'attente
+    promoted = []
+    if previous_status == "confirmed":
+        promoted = promote_waitlist(db, [registration.event_id])
     db.commit()
+    if previous_status == "confirmed":
+        invalidate_event_availability(db, [registration.event_id])
     
     # Audit trail
     logger.info(f"Registration cancelled: {registration_id} by user {current_user.id}")
     
     return ApiResponse(
         success=True,
-        message="Inscription annulée avec succès"
+        message="Inscription annulée avec succès",
+        data={"promoted": promoted}
     )
 
-@app.get("/api/event-registrations/event/{event_id}")
-async def get_event_registrations(
-    event_id: str,
+@app.post("/api/event-registrations/bulk-register", response_model=ApiResponse[List[BulkRegistrationResult]])
+def bulk_register_for_event(
+    request: BulkRegistrationRequest,
     current_user: Employee = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    page: int = 1,
-    limit: int = 50,
-    status: Optional[str] = None
+    db: Session = Depends(get_db)
 ):
-    """Récupération sécurisée des inscriptions d'un événement"""
-    
-    # Vérification des permissions (HR ou participant)
-    event = db.query(Event).filter(Event.id == event_id).first()
+    """Inscription groupée (département ou liste d'employés) avec détection des conflits par lots"""
+
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes pour l'inscription HR")
+    if not request.employee_ids and not request.department:
+        raise HTTPException(status_code=400, detail="Liste d'employés ou département requis")
+
+    # Verrou sur l'événement : sérialise avec les inscriptions individuelles concurrentes
+    event = db.query(Event).filter(Event.id == request.event_id).with_for_update().first()
     if not event:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
-    
-    # Seuls HR ou les participants peuvent voir les inscriptions
+
+    # Candidats (ordre de la requête, puis département par nom)
+    candidate_filter = []
+    if request.employee_ids:
+        candidate_filter.append(Employee.id.in_(request.employee_ids))
+    if request.department:
+        candidate_filter.append(and_(Employee.department == request.department, Employee.is_active == True))
+    employees = db.query(Employee.id, Employee.name).filter(or_(*candidate_filter)).order_by(Employee.name).all()
+    names = {str(employee.id): employee.name for employee in employees}
+    employee_keys = {str(employee.id): employee.id for employee in employees}
+
+    ordered_ids = list(dict.fromkeys(request.employee_ids))
+    requested = set(ordered_ids)
+    ordered_ids += [employee_id for employee_id in names if employee_id not in requested]
+    candidate_ids = [employee_id for employee_id in ordered_ids if employee_id in names]
+
+    # Chargement ensembliste : inscriptions existantes, congés et engagements sur la période
+    already_registered = {
+        str(employee_id) for (employee_id,) in db.query(EventRegistration.employee_id).filter(
+            EventRegistration.event_id == request.event_id,
+            EventRegistration.employee_id.in_(candidate_ids),
+            EventRegistration.status != "cancelled"
+        ).all()
+    }
+
+    busy = [
+        (leave.start_date, leave.end_date, str(leave.employee_id),
+         f"Congé du {leave.start_date} au {leave.end_date}")
+        for leave in db.query(
+            LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date
+        ).filter(
+            LeaveRequest.employee_id.in_(candidate_ids),
+            LeaveRequest.status == LeaveStatus.approved,
+            LeaveRequest.start_date <= event.end_date,
+            LeaveRequest.end_date >= event.start_date
+        ).all()
+    ]
+    busy += [
+        (commitment.start_date, commitment.end_date, str(commitment.employee_id),
+         f"Événement '{commitment.title}'")
+        for commitment in db.query(
+            EventRegistration.employee_id, Event.title, Event.start_date, Event.end_date
+        ).join(Event, Event.id == EventRegistration.event_id).filter(
+            EventRegistration.employee_id.in_(candidate_ids),
+            EventRegistration.status == "confirmed",
+            Event.id != event.id,
+            Event.start_date <= event.end_date,
+            Event.end_date >= event.start_date
+        ).all()
+    ]
+    conflicts = sweep_interval_conflicts(event.start_date, event.end_date, busy)
+
+    # Attribution des places en une passe, dans l'ordre des candidats
+    if event.max_attendees and event.max_attendees > 0:
+        free_seats = max(event.max_attendees - event.confirmed_count, 0)
+    else:
+        free_seats = None
+
+    now = datetime.utcnow()
+    results = []
+    rows = []
+    for employee_id in ordered_ids:
+        if employee_id not in names:
+            results.append(BulkRegistrationResult(employee_id=employee_id, status="not_found"))
+            continue
+        if employee_id in already_registered:
+            results.append(BulkRegistrationResult(
+                employee_id=employee_id, employee_name=names[employee_id], status="already_registered"
+            ))
+            continue
+
+        employee_conflicts = conflicts.get(employee_id, [])
+        if employee_conflicts and not request.ignore_conflicts:
+            results.append(BulkRegistrationResult(
+                employee_id=employee_id, employee_name=names[employee_id],
+                status="conflict", conflicts=employee_conflicts
+            ))
+            continue
+
+        if free_seats is None or free_seats > 0:
+            status = "confirmed"
+            if free_seats is not None:
+                free_seats -= 1
+        else:
+            status = "waitlist"
+
+        registration_id = uuid4()
+        confirmation_code = secrets.token_urlsafe(8)
+        rows.append({
+            "id": registration_id,
+            "event_id": event.id,
+            "employee_id": employee_keys[employee_id],
+            "status": status,
+            "confirmation_code": confirmation_code,
+            "notes": request.notes,
+            # Horodatages strictement croissants : conserve l'ordre FIFO de la liste d'attente
+            "registration_date": now + timedelta(microseconds=len(rows)),
+            "created_at": now,
+            "updated_at": now,
+        })
+        results.append(BulkRegistrationResult(
+            employee_id=employee_id, employee_name=names[employee_id], status=status,
+            registration_id=str(registration_id), confirmation_code=confirmation_code,
+            conflicts=employee_conflicts
+        ))
+
+    if rows:
+        db.execute(insert(EventRegistration), rows)
+        confirmed = sum(1 for row in rows if row["status"] == "confirmed")
+        if confirmed:
+            adjust_event_counters(db, event.id, new_status="confirmed", amount=confirmed)
+        if len(rows) - confirmed:
+            adjust_event_counters(db, event.id, new_status="waitlist", amount=len(rows) - confirmed)
+    db.commit()
+    mark_event_attendees_busy(db, request.event_id, [row["employee_id"] for row in rows if row["status"] == "confirmed"])
+
+    logger.info(f"Bulk registration: {len(rows)} registration(s) for event {request.event_id} by user {current_user.id}")
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(rows)} inscription(s) créée(s) sur {len(ordered_ids)} demandée(s)",
+        data=results
+    )
+
+@app.post("/api/event-registrations/cancel-bulk")
+def cancel_registrations_bulk(
+    request: BulkCancellationRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Annulation groupée d'inscriptions avec promotion de la liste d'attente en une passe"""
+
+    registrations = db.query(
+        EventRegistration.id, EventRegistration.event_id, EventRegistration.employee_id,
+        EventRegistration.status, Event.cancellation_deadline
+    ).join(Event, Event.id == EventRegistration.event_id).filter(
+        EventRegistration.id.in_(request.registration_ids),
+        EventRegistration.status != "cancelled"
+    ).with_for_update(of=EventRegistration).all()
+
+    is_hr = current_user.role in ["hr_officer", "hr_head"]
+    if not is_hr and any(row.employee_id != current_user.id for row in registrations):
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    now = datetime.utcnow()
+    to_cancel = [row for row in registrations if not row.cancellation_deadline or now <= row.cancellation_deadline]
+    past_deadline = [str(row.id) for row in registrations if row.cancellation_deadline and now > row.cancellation_deadline]
+    found = {str(row.id) for row in registrations}
+    not_found = [registration_id for registration_id in request.registration_ids if registration_id not in found]
+
+    if to_cancel:
+        db.execute(
+            update(EventRegistration)
+            .where(EventRegistration.id.in_([row.id for row in to_cancel]))
+            .values(status="cancelled", updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    released: Dict[tuple, int] = {}
+    for row in to_cancel:
+        released[(row.event_id, row.status)] = released.get((row.event_id, row.status), 0) + 1
+    # Même ordre de verrouillage des événements que promote_waitlist (pas d'interblocage)
+    for (event_id, status), amount in sorted(released.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        adjust_event_counters(db, event_id, old_status=status, new_status="cancelled", amount=amount)
+
+    released_events = [event_id for event_id, status in released if status == "confirmed"]
+    promoted = promote_waitlist(db, released_events)
+    db.commit()
+    invalidate_event_availability(db, released_events)
+
+    logger.info(f"Bulk cancellation: {len(to_cancel)} registration(s) by user {current_user.id}")
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(to_cancel)} inscription(s) annulée(s)",
+        data={
+            "cancelled": [str(row.id) for row in to_cancel],
+            "past_deadline": past_deadline,
+            "not_found": not_found,
+            "promoted": promoted
+        }
+    )
+
+def event_summary(event: Event) -> EventSummary:
+    return EventSummary(
+        id=str(event.id),
+        title=event.title,
+        type=event.type,
+        start_date=event.start_date,
+        end_date=event.end_date,
+        location=event.location,
+        status=event.status
+    )
+
+@app.post("/api/event-registrations/{registration_id}/confirm", response_model=ApiResponse[RegistrationResponse])
+def confirm_registration(
+    registration_id: str,
+    request: ConfirmationRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Validation d'une inscription par son code de confirmation"""
+
+    registration = db.query(EventRegistration).filter(EventRegistration.id == registration_id).first()
+    if not registration:
+        raise HTTPException(status_code=404, detail="Inscription non trouvée")
+
+    if (registration.employee_id != current_user.id and
+        current_user.role not in ["hr_officer", "hr_head"]):
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    if not registration.confirmation_code or not secrets.compare_digest(
+        registration.confirmation_code, request.confirmation_code
+    ):
+        logger.warning(f"Invalid confirmation code for registration {registration_id} by user {current_user.id}")
+        raise HTTPException(status_code=400, detail="Code de confirmation invalide")
+
+    if registration.status == "cancelled":
+        raise HTTPException(status_code=400, detail="Inscription annulée")
+
+    if registration.confirmed_at is None:
+        registration.confirmed_at = datetime.utcnow()
+        db.commit()
+
+    message = "Inscription validée" if registration.status == "confirmed" else "Inscription validée, en liste d'attente"
+    return ApiResponse(
+        success=True,
+        message=message,
+        data=RegistrationResponse(
+            success=True,
+            registration_id=str(registration.id),
+            status=registration.status,
+            message=message,
+            confirmation_code=registration.confirmation_code
+        )
+    )
+
+@app.get("/api/event-registrations/code/{confirmation_code}", response_model=ApiResponse[CheckInLookupResponse])
+def lookup_registration_by_code(
+    confirmation_code: str,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Recherche d'une inscription par code (bornes d'accueil) : une requête sur l'index unique"""
+
     if current_user.role not in ["hr_officer", "hr_head"]:
-        participant_registration = db.query(EventRegistration).filter(
-            EventRegistration.event_id == event_id,
-            EventRegistration.employee_id == current_user.id
-        ).first()
-        if not participant_registration:
-            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    row = db.query(EventRegistration, Employee.name, Employee.department, Event).join(
+        Employee, Employee.id == EventRegistration.employee_id
+    ).join(
+        Event, Event.id == EventRegistration.event_id
+    ).filter(EventRegistration.confirmation_code == confirmation_code).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Code inconnu")
+
+    registration, employee_name, department, event = row
+    return ApiResponse(
+        success=True,
+        message="Inscription trouvée",
+        data=CheckInLookupResponse(
+            registration_id=str(registration.id),
+            status=registration.status,
+            confirmed_at=registration.confirmed_at,
+            employee_id=str(registration.employee_id),
+            employee_name=employee_name,
+            department=department,
+            event=event_summary(event)
+        )
+    )
+
+@app.get("/api/event-registrations/employee/{employee_id}", response_model=PaginatedResponse)
+def get_employee_registrations(
+    employee_id: str,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    status: Optional[str] = None
+):
+    """Inscriptions d'un employé avec le résumé des événements, chargés dans la même requête"""
+
+    if str(current_user.id) != employee_id and current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Accès non autorisé")
+
+    query = db.query(EventRegistration).filter(EventRegistration.employee_id == employee_id)
+    if status:
+        query = query.filter(EventRegistration.status == status)
+
+    total = query.count()
+    registrations = query.options(joinedload(EventRegistration.event)).order_by(
+        EventRegistration.registration_date.desc()
+    ).offset((page - 1) * limit).limit(limit).all()
+
+    return PaginatedResponse(
+        data=[
+            EmployeeRegistrationResponse(
+                id=str(registration.id),
+                event_id=str(registration.event_id),
+                employee_id=str(registration.employee_id),
+                status=registration.status,
+                registration_date=registration.registration_date,
+                confirmation_code=registration.confirmation_code,
+                confirmed_at=registration.confirmed_at,
+                notes=registration.notes,
+                event=event_summary(registration.event)
+            )
+            for registration in registrations
+        ],
+        total=total,
+        page=page,
+        limit=limit,
+        total_pages=(total + limit - 1) // limit
+    )
+
+@app.get("/api/event-registrations/event/{event_id}", response_model=EventRegistrationListResponse)
+def get_event_registrations(
+    event_id: str,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1),
+    status: Optional[str] = None
+):
+    """Récupération sécurisée des inscriptions d'un événement
+
+    Une seule requête : inscriptions, informations des employés, total (fonction de
+    fenêtre) et contrôle d'accès (HR ou participant, via EXISTS).
+    """
     
     # Limite de sécurité
     limit = min(limit, 100)
-    
-    query = db.query(EventRegistration).filter(EventRegistration.event_id == event_id)
+    is_hr = current_user.role in ["hr_officer", "hr_head"]
+
+    # Seuls HR ou les participants peuvent voir les inscriptions
+    is_participant = exists().where(
+        EventRegistration.event_id == event_id,
+        EventRegistration.employee_id == current_user.id
+    )
+
+    query = db.query(
+        EventRegistration.id, EventRegistration.event_id, EventRegistration.employee_id,
+        EventRegistration.status, EventRegistration.registration_date,
+        EventRegistration.confirmation_code, EventRegistration.confirmed_at, EventRegistration.notes,
+        Employee.name, Employee.department, Employee.email,
+        func.count().over().label("total")
+    ).join(Employee, Employee.id == EventRegistration.employee_id).filter(
+        EventRegistration.event_id == event_id
+    )
+    if not is_hr:
+        query = query.filter(is_participant)
     if status:
         query = query.filter(EventRegistration.status == status)
-    
-    total = query.count()
-    registrations = query.offset((page - 1) * limit).limit(limit).all()
-    
-    return PaginatedResponse(
-        data=registrations,
+
+    rows = query.order_by(EventRegistration.registration_date, EventRegistration.id).offset(
+        (page - 1) * limit
+    ).limit(limit).all()
+
+    if rows:
+        total = rows[0].total
+    else:
+        # Aucune ligne : événement inexistant, accès refusé, ou page vide
+        event_found, participant = db.query(
+            exists().where(Event.id == event_id), is_participant
+        ).one()
+        if not event_found:
+            raise HTTPException(status_code=404, detail="Événement non trouvé")
+        if not is_hr and not participant:
+            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        total = query.order_by(None).count() if page > 1 else 0
+
+    return EventRegistrationListResponse(
+        data=[
+            EventRegistrationListItem(
+                id=str(row.id),
+                event_id=str(row.event_id),
+                employee_id=str(row.employee_id),
+                employee_name=row.name,
+                employee_department=row.department,
+                employee_email=row.email,
+                status=row.status,
+                registration_date=row.registration_date,
+                # Le code de confirmation n'est visible que par HR et son titulaire
+                confirmation_code=row.confirmation_code if is_hr or row.employee_id == current_user.id else None,
+                confirmed_at=row.confirmed_at,
+                notes=row.notes
+            )
+            for row in rows
+        ],
         total=total,
         page=page,
         limit=limit,
-        totalPages=(total + limit - 1) // limit
+        total_pages=(total + limit - 1) // limit
     )
 
 @app.post("/api/event-registrations/check-conflicts")
@@ -2352,80 +3904,1779 @@ async def get_event_capacity(
     event = db.query(Event).filter(Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
-    
-    current_registrations = db.query(EventRegistration).filter(
-        EventRegistration.event_id == event_id,
-        EventRegistration.status == "confirmed"
-    ).count()
-    
-    waitlist_size = db.query(EventRegistration).filter(
-        EventRegistration.event_id == event_id,
-        EventRegistration.status == "waitlist"
-    ).count()
-    
-    capacity = EventCapacity(
-        event_id=event_id,
-        max_attendees=event.max_attendees or 0,
-        current_attendees=current_registrations,
-        waitlist_enabled=True,
-        waitlist_size=waitlist_size
-    )
-    
+
+    capacity = event_capacity(event_id, event.max_attendees, event.confirmed_count,
+                              event.waitlist_count, event.cancellation_deadline)
+
     return ApiResponse(
         success=True,
         message="Capacité récupérée",
         data=capacity
     )
 
+@app.post("/api/event-registrations/capacity/batch", response_model=ApiResponse[List[EventCapacity]])
+def get_event_capacities(
+    request: CapacityBatchRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Capacité de plusieurs événements en une requête (compteurs dénormalisés)"""
+
+    rows = db.query(
+        Event.id, Event.max_attendees, Event.confirmed_count, Event.waitlist_count, Event.cancellation_deadline
+    ).filter(Event.id.in_(request.event_ids)).all()
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(rows)} capacité(s) récupérée(s)",
+        data=[
+            event_capacity(str(row.id), row.max_attendees, row.confirmed_count,
+                           row.waitlist_count, row.cancellation_deadline)
+            for row in rows
+        ]
+    )
+
+@app.post("/api/event-registrations/capacity/reconcile")
+async def reconcile_capacity_counters(
+    event_id: Optional[str] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Réconciliation des compteurs de capacité avec les inscriptions réelles"""
+
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    corrected = reconcile_event_counters(db, event_id)
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(corrected)} événement(s) corrigé(s)",
+        data={"corrected": corrected}
+    )
+
+# Helper functions for denormalized capacity counters
+REGISTRATION_COUNTER_COLUMNS = {
+    "confirmed": "confirmed_count",
+    "waitlist": "waitlist_count",
+}
+
+def adjust_event_counters(
+    db: Session,
+    event_id: str,
+    old_status: Optional[str] = None,
+    new_status: Optional[str] = None,
+    amount: int = 1
+):
+    """Mise à jour atomique (UPDATE col = col ± n) des compteurs d'un événement"""
+    old_column = REGISTRATION_COUNTER_COLUMNS.get(old_status)
+    new_column = REGISTRATION_COUNTER_COLUMNS.get(new_status)
+    if old_column == new_column:
+        return
+
+    values = {}
+    if old_column:
+        values[old_column] = getattr(Event, old_column) - amount
+    if new_column:
+        values[new_column] = getattr(Event, new_column) + amount
+
+    db.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def reserve_event_seat(db: Session, event_id: str) -> Optional[str]:
+    """Réservation atomique d'une place par UPDATE conditionnel sur le compteur
+
+    Le verrou de ligne pris par l'UPDATE sérialise les inscriptions concurrentes :
+    la condition confirmed_count < max_attendees est réévaluée sur la dernière
+    version de la ligne, ce qui empêche toute surréservation. Retourne le statut
+    attribué ("confirmed" ou "waitlist"), ou None si l'événement n'existe pas.
+    """
+    seat = db.execute(
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(
+                Event.max_attendees.is_(None),
+                Event.max_attendees <= 0,
+                Event.confirmed_count < Event.max_attendees,
+            )
+        )
+        .values(confirmed_count=Event.confirmed_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if seat.rowcount == 1:
+        return "confirmed"
+
+    waitlist = db.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .values(waitlist_count=Event.waitlist_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return "waitlist" if waitlist.rowcount == 1 else None
+
+def create_event_registration(
+    db: Session,
+    event_id: str,
+    employee_id: str,
+    notes: Optional[str] = None,
+    emergency_contact: Optional[dict] = None,
+    ip_address: Optional[str] = None
+) -> Optional[EventRegistration]:
+    """Création d'une inscription avec réservation atomique de place, en une transaction courte"""
+    registration = EventRegistration(
+        event_id=event_id,
+        employee_id=employee_id,
+        confirmation_code=secrets.token_urlsafe(8),
+        ip_address=ip_address,
+        notes=notes,
+        emergency_contact_name=emergency_contact.get('name') if emergency_contact else None,
+        emergency_contact_phone=emergency_contact.get('phone') if emergency_contact else None,
+        emergency_contact_relationship=emergency_contact.get('relationship') if emergency_contact else None,
+    )
+
+    # Le verrou sur la ligne de l'événement est tenu jusqu'au commit : rien d'autre
+    # ne doit s'exécuter entre la réservation et la validation de la transaction
+    try:
+        status = reserve_event_seat(db, event_id)
+        if status is None:
+            db.rollback()
+            return None
+
+        registration.status = status
+        db.add(registration)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    db.refresh(registration)
+    return registration
+
+def promote_waitlist(db: Session, event_ids: List[str]) -> List[dict]:
+    """Promotion FIFO des inscriptions en liste d'attente vers les places libérées
+
+    Traite plusieurs événements en une passe : les lignes des événements sont
+    verrouillées (ordre stable pour éviter les interblocages), puis un seul UPDATE
+    promeut pour chaque événement les plus anciennes inscriptions en attente
+    (registration_date) dans la limite des places libres, via l'index
+    (event_id, status, registration_date). Les notifications de promotion sont
+    mises en file dans la même transaction. Le commit est laissé à l'appelant.
+    """
+    event_ids = sorted({str(event_id) for event_id in event_ids})
+    if not event_ids:
+        return []
+
+    db.query(Event.id).filter(Event.id.in_(event_ids)).order_by(Event.id).with_for_update().all()
+
+    ranked = (
+        select(
+            EventRegistration.id.label("id"),
+            EventRegistration.event_id.label("event_id"),
+            func.row_number().over(
+                partition_by=EventRegistration.event_id,
+                order_by=(EventRegistration.registration_date, EventRegistration.id)
+            ).label("position"),
+        )
+        .where(
+            EventRegistration.event_id.in_(event_ids),
+            EventRegistration.status == "waitlist"
+        )
+        .subquery()
+    )
+    eligible = (
+        select(ranked.c.id)
+        .join(Event, Event.id == ranked.c.event_id)
+        .where(or_(
+            Event.max_attendees.is_(None),
+            Event.max_attendees <= 0,
+            ranked.c.position <= Event.max_attendees - Event.confirmed_count,
+        ))
+    )
+
+    promoted = db.execute(
+        update(EventRegistration)
+        .where(EventRegistration.id.in_(eligible), EventRegistration.status == "waitlist")
+        .values(status="confirmed", updated_at=datetime.utcnow())
+        .returning(EventRegistration.id, EventRegistration.event_id, EventRegistration.employee_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not promoted:
+        return []
+
+    promoted_per_event: Dict[Any, int] = {}
+    for _, event_id, _ in promoted:
+        promoted_per_event[event_id] = promoted_per_event.get(event_id, 0) + 1
+    for event_id, amount in promoted_per_event.items():
+        adjust_event_counters(db, event_id, old_status="waitlist", new_status="confirmed", amount=amount)
+
+    titles = dict(db.query(Event.id, Event.title).filter(Event.id.in_(list(promoted_per_event))).all())
+    db.execute(insert(Notification), [
+        {
+            "id": uuid4(),
+            "user_id": employee_id,
+            "type": NotificationType.waitlist_promotion,
+            "title": "Inscription confirmée",
+            "message": f"Une place s'est libérée : votre inscription à « {titles.get(event_id, '')} » est confirmée.",
+            "read": False,
+            "created_at": datetime.utcnow(),
+        }
+        for _, event_id, employee_id in promoted
+    ])
+
+    logger.info(f"Liste d'attente : {len(promoted)} inscription(s) promue(s) sur {len(promoted_per_event)} événement(s)")
+    return [
+        {"registration_id": str(registration_id), "event_id": str(event_id), "employee_id": str(employee_id)}
+        for registration_id, event_id, employee_id in promoted
+    ]
+
+def sweep_interval_conflicts(
+    window_start: datetime,
+    window_end: datetime,
+    busy: List[tuple]
+) -> Dict[str, List[str]]:
+    """Balayage des intervalles occupés (start, end, employee_id, label) triés par début
+
+    S'arrête au premier intervalle qui commence après la fenêtre ; retourne les
+    libellés des intervalles qui la recouvrent, regroupés par employé.
+    """
+    conflicts: Dict[str, List[str]] = {}
+    for start, end, employee_id, label in sorted(busy, key=lambda interval: interval[0]):
+        if start > window_end:
+            break
+        if end >= window_start:
+            conflicts.setdefault(employee_id, []).append(label)
+    return conflicts
+
+def reconcile_event_counters(db: Session, event_id: Optional[str] = None) -> List[dict]:
+    """Job de réparation : recalcule les compteurs depuis event_registrations et corrige les écarts"""
+    counts = (
+        select(
+            EventRegistration.event_id.label("event_id"),
+            func.count().filter(EventRegistration.status == "confirmed").label("confirmed"),
+            func.count().filter(EventRegistration.status == "waitlist").label("waitlist"),
+        )
+        .group_by(EventRegistration.event_id)
+        .subquery()
+    )
+    confirmed = func.coalesce(counts.c.confirmed, 0)
+    waitlist = func.coalesce(counts.c.waitlist, 0)
+
+    query = (
+        db.query(Event.id, Event.confirmed_count, Event.waitlist_count, confirmed, waitlist)
+        .outerjoin(counts, counts.c.event_id == Event.id)
+        .filter((Event.confirmed_count != confirmed) | (Event.waitlist_count != waitlist))
+    )
+    if event_id:
+        query = query.filter(Event.id == event_id)
+
+    corrected = []
+    for row_id, old_confirmed, old_waitlist, new_confirmed, new_waitlist in query.with_for_update(of=Event).all():
+        db.execute(
+            update(Event)
+            .where(Event.id == row_id)
+            .values(confirmed_count=new_confirmed, waitlist_count=new_waitlist)
+            .execution_options(synchronize_session=False)
+        )
+        corrected.append({
+            "event_id": str(row_id),
+            "confirmed_count": {"before": old_confirmed, "after": new_confirmed},
+            "waitlist_count": {"before": old_waitlist, "after": new_waitlist},
+        })
+
+    db.commit()
+
+    if corrected:
+        logger.warning(f"Compteurs de capacité corrigés pour {len(corrected)} événement(s)")
+    return corrected
+
 # Helper function for conflict checking
 def check_registration_conflicts(db: Session, event_id: str, employee_id: str) -> List[RegistrationConflictResponse]:
-    """Vérification des conflits d'inscription"""
+    """Vérification des conflits d'inscription
+
+    Deux requêtes de chevauchement d'intervalles indexées, indépendantes du nombre
+    d'événements déjà suivis par l'employé : congés approuvés qui recouvrent
+    l'événement, et inscriptions confirmées jointes aux événements qui le recouvrent.
+    """
     conflicts = []
-    
+
+    event = db.query(Event.start_date, Event.end_date).filter(Event.id == event_id).first()
+    if not event:
+        return conflicts
+
     # Vérification des conflits avec les congés
-    leaves = db.query(LeaveRequest).filter(
+    overlapping_leaves = db.query(LeaveRequest.start_date, LeaveRequest.end_date).filter(
         LeaveRequest.employee_id == employee_id,
-        LeaveRequest.status == "approved"
+        LeaveRequest.status == LeaveStatus.approved,
+        LeaveRequest.start_date <= event.end_date,
+        LeaveRequest.end_date >= event.start_date
     ).all()
-    
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if event:
-        for leave in leaves:
-            if (leave.start_date <= event.end_date and leave.end_date >= event.start_date):
-                conflicts.append(RegistrationConflictResponse(
-                    id=str(uuid4()),
-                    event_id=event_id,
-                    employee_id=employee_id,
-                    conflict_type="leave_overlap",
-                    conflict_details=f"Conflit avec le congé du {leave.start_date} au {leave.end_date}",
-                    severity="high",
-                    resolved=False,
-                    created_at=datetime.utcnow()
-                ))
-    
+
+    for leave in overlapping_leaves:
+        conflicts.append(RegistrationConflictResponse(
+            id=str(uuid4()),
+            event_id=event_id,
+            employee_id=employee_id,
+            conflict_type="leave_overlap",
+            conflict_details=f"Conflit avec le congé du {leave.start_date} au {leave.end_date}",
+            severity="high",
+            resolved=False,
+            created_at=datetime.utcnow()
+        ))
+
     # Vérification des conflits avec d'autres événements
-    other_registrations = db.query(EventRegistration).filter(
+    overlapping_events = db.query(Event.title).join(
+        EventRegistration, EventRegistration.event_id == Event.id
+    ).filter(
         EventRegistration.employee_id == employee_id,
-        EventRegistration.status == "confirmed"
+        EventRegistration.status == "confirmed",
+        Event.id != event_id,
+        Event.start_date <= event.end_date,
+        Event.end_date >= event.start_date
     ).all()
-    
-    for reg in other_registrations:
-        other_event = db.query(Event).filter(Event.id == reg.event_id).first()
-        if other_event and other_event.id != event_id:
-            if (other_event.start_date <= event.end_date and other_event.end_date >= event.start_date):
-                conflicts.append(RegistrationConflictResponse(
-                    id=str(uuid4()),
-                    event_id=event_id,
-                    employee_id=employee_id,
-                    conflict_type="event_overlap",
-                    conflict_details=f"Conflit avec l'événement '{other_event.title}'",
-                    severity="medium",
-                    resolved=False,
-                    created_at=datetime.utcnow()
-                ))
-    
+
+    for other_event in overlapping_events:
+        conflicts.append(RegistrationConflictResponse(
+            id=str(uuid4()),
+            event_id=event_id,
+            employee_id=employee_id,
+            conflict_type="event_overlap",
+            conflict_details=f"Conflit avec l'événement '{other_event.title}'",
+            severity="medium",
+            resolved=False,
+            created_at=datetime.utcnow()
+        ))
+
     return conflicts
 
+# Availability Engine
+availability_index = AvailabilityIndex()
+
+class AvailabilityQuery(BaseModel):
+    start: datetime
+    end: datetime
+    employee_ids: List[str] = Field(default_factory=list, max_length=20000)
+    department: Optional[str] = None
+
+def resolve_employee_selection(db: Session, employee_ids: List[str], department: Optional[str]) -> list:
+    """Employés désignés par une liste d'identifiants et/ou un département (actifs), triés par nom"""
+    selection = []
+    if employee_ids:
+        selection.append(Employee.id.in_(employee_ids))
+    if department:
+        selection.append(and_(Employee.department == department, Employee.is_active == True))
+    if not selection:
+        return []
+    return db.query(Employee.id, Employee.name).filter(or_(*selection)).order_by(Employee.name).all()
+
+def ensure_availability_loaded(db: Session, start: datetime, end: datetime):
+    """Chargement des bitmaps manquants de la période : deux requêtes pour tous les jours manquants"""
+    missing = availability_index.missing_days([day for day, _, _ in day_slot_ranges(start, end)])
+    if not missing:
+        return
+
+    window_start = datetime.combine(min(missing), datetime.min.time())
+    window_end = datetime.combine(max(missing) + timedelta(days=1), datetime.min.time())
+
+    leaves = db.query(LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date).filter(
+        LeaveRequest.status == LeaveStatus.approved,
+        LeaveRequest.start_date < window_end,
+        LeaveRequest.end_date >= window_start
+    ).all()
+    commitments = db.query(EventRegistration.employee_id, Event.start_date, Event.end_date).join(
+        Event, Event.id == EventRegistration.event_id
+    ).filter(
+        EventRegistration.status == "confirmed",
+        Event.status != EventStatus.cancelled,
+        Event.start_date < window_end,
+        Event.end_date > window_start
+    ).all()
+
+    intervals = [(str(employee_id), *leave_interval(start_date, end_date)) for employee_id, start_date, end_date in leaves]
+    intervals += [(str(employee_id), start_date, end_date) for employee_id, start_date, end_date in commitments]
+    availability_index.load_days(missing, intervals)
+
+def leave_snapshot(leave: LeaveRequest) -> tuple:
+    """État d'un congé avant modification : (statut, début, fin, type)"""
+    return (leave.status, leave.start_date, leave.end_date, leave.type)
+
+def after_leave_change(previous: Optional[tuple], leave: Optional[LeaveRequest]):
+    """Répercussion d'un changement de congé (après commit) sur les index en mémoire
+
+    Un congé approuvé est ajouté incrémentalement aux bitmaps ; un congé approuvé
+    qui disparaît ou change de dates invalide les jours qu'il couvrait. Les cartes
+    de chaleur des absences recoupant l'ancienne ou la nouvelle période sont invalidées.
+    """
+    changed = leave is None or leave_snapshot(leave) != previous
+    if previous and previous[0] == LeaveStatus.approved and changed:
+        availability_index.invalidate(previous[1].date(), previous[2].date())
+        absence_heatmap_cache.invalidate(previous[1].date(), previous[2].date())
+    if leave is not None and leave.status == LeaveStatus.approved:
+        availability_index.mark_busy(str(leave.employee_id), *leave_interval(leave.start_date, leave.end_date))
+        if changed:
+            absence_heatmap_cache.invalidate(leave.start_date.date(), leave.end_date.date())
+
+def mark_event_attendees_busy(db: Session, event_id: str, employee_ids: List[str]):
+    """Mise à jour incrémentale des bitmaps pour de nouvelles inscriptions confirmées"""
+    event_dates = db.query(Event.start_date, Event.end_date).filter(Event.id == event_id).first()
+    if event_dates:
+        for employee_id in employee_ids:
+            availability_index.mark_busy(str(employee_id), event_dates.start_date, event_dates.end_date)
+
+def invalidate_event_availability(db: Session, event_ids: List[str]):
+    """Invalidation des jours couverts par des événements dont les participants ont changé"""
+    if not event_ids:
+        return
+    for start_date, end_date in db.query(Event.start_date, Event.end_date).filter(Event.id.in_(event_ids)).all():
+        availability_index.invalidate(start_date.date(), end_date.date())
+
+@app.post("/api/availability/query")
+def query_availability(
+    query: AvailabilityQuery,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Disponibilité d'un ensemble d'employés sur un créneau (bitmaps vectorisés)"""
+
+    if query.end <= query.start:
+        raise HTTPException(status_code=400, detail="La fin doit être postérieure au début")
+    if (query.end - query.start).days > 366:
+        raise HTTPException(status_code=400, detail="Période limitée à un an")
+
+    employees = resolve_employee_selection(db, query.employee_ids, query.department)
+    if not employees:
+        raise HTTPException(status_code=400, detail="Liste d'employés ou département requis")
+
+    ensure_availability_loaded(db, query.start, query.end)
+    employee_ids = [str(employee.id) for employee in employees]
+    free = availability_index.free_mask(employee_ids, query.start, query.end)
+
+    free_ids = [employee_id for employee_id, is_free in zip(employee_ids, free) if is_free]
+    busy_ids = [employee_id for employee_id, is_free in zip(employee_ids, free) if not is_free]
+
+    return ApiResponse(
+        success=True,
+        message="Disponibilités calculées",
+        data={
+            "start": query.start,
+            "end": query.end,
+            "free": free_ids,
+            "busy": busy_ids,
+            "free_count": len(free_ids),
+            "busy_count": len(busy_ids)
+        }
+    )
+
+class SlotSuggestionRequest(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    duration_minutes: int = Field(..., gt=0, le=24 * 60)
+    employee_ids: List[str] = Field(default_factory=list, max_length=20000)
+    department: Optional[str] = None
+    top_n: int = Field(5, ge=1, le=50)
+    working_hours_start: int = Field(9, ge=0, le=23)
+    working_hours_end: int = Field(18, ge=1, le=24)
+    include_weekends: bool = False
+
+@app.post("/api/availability/suggest-slots")
+def suggest_slots(
+    request: SlotSuggestionRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Meilleurs créneaux pour un événement, classés par nombre d'invités disponibles"""
+
+    if request.window_end <= request.window_start:
+        raise HTTPException(status_code=400, detail="La fin de la période doit être postérieure au début")
+    if (request.window_end - request.window_start).days > 92:
+        raise HTTPException(status_code=400, detail="Période de recherche limitée à trois mois")
+    if request.working_hours_end <= request.working_hours_start:
+        raise HTTPException(status_code=400, detail="Horaires de travail invalides")
+
+    duration_slots = -(-request.duration_minutes // SLOT_MINUTES)
+    first_slot = request.working_hours_start * 60 // SLOT_MINUTES
+    last_slot = request.working_hours_end * 60 // SLOT_MINUTES
+    if duration_slots > last_slot - first_slot:
+        raise HTTPException(status_code=400, detail="Durée supérieure à la plage horaire de travail")
+
+    employees = resolve_employee_selection(db, request.employee_ids, request.department)
+    if not employees:
+        raise HTTPException(status_code=400, detail="Liste d'employés ou département requis")
+
+    ensure_availability_loaded(db, request.window_start, request.window_end)
+    days = [
+        day for day, _, _ in day_slot_ranges(request.window_start, request.window_end)
+        if request.include_weekends or day.weekday() < 5
+    ]
+    employee_ids = [str(employee.id) for employee in employees]
+    rows = availability_index.rows_for(employee_ids)
+    busy = availability_index.busy_cube(days, rows)
+
+    # Débuts autorisés : dans les heures de travail et entièrement inclus dans la période
+    origin = datetime.combine(request.window_start.date(), datetime.min.time())
+    window_start_minute = (request.window_start - origin).total_seconds() / 60
+    window_end_minute = (request.window_end - origin).total_seconds() / 60
+    slot_minutes = (
+        np.array([(day - origin.date()).days * 24 * 60 for day in days])[:, None]
+        + np.arange(SLOTS_PER_DAY) * SLOT_MINUTES
+    )
+    slot_index = np.arange(SLOTS_PER_DAY)
+    allowed_starts = (
+        (slot_index >= first_slot) & (slot_index + duration_slots <= last_slot)
+        & (slot_minutes >= window_start_minute)
+        & (slot_minutes + duration_slots * SLOT_MINUTES <= window_end_minute)
+    )
+
+    names = {str(employee.id): employee.name for employee in employees}
+    suggestions = []
+    for day_index, start_slot, available in rank_slots(busy, duration_slots, allowed_starts, request.top_n):
+        start = datetime.combine(days[day_index], datetime.min.time()) + timedelta(minutes=start_slot * SLOT_MINUTES)
+        end = start + timedelta(minutes=duration_slots * SLOT_MINUTES)
+        free = availability_index.free_mask(employee_ids, start, end)
+        suggestions.append({
+            "start": start,
+            "end": end,
+            "available_count": available,
+            "unavailable_count": len(employee_ids) - available,
+            "availability_rate": round(available / len(employee_ids) * 100, 1),
+            "unavailable": [
+                {"employee_id": employee_id, "employee_name": names[employee_id]}
+                for employee_id, is_free in zip(employee_ids, free) if not is_free
+            ]
+        })
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(suggestions)} créneau(x) proposé(s)",
+        data={
+            "invitees": len(employee_ids),
+            "duration_minutes": duration_slots * SLOT_MINUTES,
+            "suggestions": suggestions
+        }
+    )
+
+# Room booking
+room_calendar = RoomCalendar()
+
+class RoomBase(BaseModel):
+    name: str = Field(..., min_length=1)
+    location: Optional[str] = None
+    capacity: Optional[int] = Field(None, gt=0)
+
+class RoomCreate(RoomBase):
+    pass
+
+class RoomUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1)
+    location: Optional[str] = None
+    capacity: Optional[int] = Field(None, gt=0)
+    is_active: Optional[bool] = None
+
+class RoomResponse(RoomBase):
+    id: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+def room_to_response(room: Room) -> RoomResponse:
+    return RoomResponse(
+        id=str(room.id),
+        name=room.name,
+        location=room.location,
+        capacity=room.capacity,
+        is_active=room.is_active,
+        created_at=room.created_at,
+        updated_at=room.updated_at
+    )
+
+def ensure_room_calendars(db: Session, rooms: List[Room]):
+    """Rechargement, en une requête, des salles dont le calendrier en mémoire n'est pas à jour"""
+    stale = [room for room in rooms if not room_calendar.is_current(str(room.id), room.calendar_version)]
+    if not stale:
+        return
+
+    bookings: Dict[str, list] = {str(room.id): [] for room in stale}
+    rows = db.query(Event.room_id, Event.start_date, Event.end_date, Event.id).filter(
+        Event.room_id.in_([room.id for room in stale]),
+        Event.status != EventStatus.cancelled
+    ).all()
+    for room_id, start_date, end_date, event_id in rows:
+        bookings[str(room_id)].append((start_date, end_date, str(event_id)))
+    for room in stale:
+        room_calendar.load_room(str(room.id), room.calendar_version, bookings[str(room.id)])
+
+def reserve_room(
+    db: Session,
+    room_id: str,
+    start: datetime,
+    end: datetime,
+    event_id: Optional[str] = None,
+    max_attendees: Optional[int] = None
+) -> Room:
+    """Vérification d'une réservation de salle, sous verrou de la salle jusqu'au commit
+
+    Lève une HTTPException 409 en cas de double réservation. Le calendrier en mémoire
+    est mis à jour par l'appelant après le commit (room_calendar.book).
+    """
+    room = db.query(Room).filter(Room.id == room_id).with_for_update().first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+    if not room.is_active:
+        raise HTTPException(status_code=400, detail="Salle inactive")
+    if room.capacity and max_attendees and max_attendees > room.capacity:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Capacité de la salle dépassée ({max_attendees} > {room.capacity})"
+        )
+
+    ensure_room_calendars(db, [room])
+    conflicts = room_calendar.find_conflicts(str(room.id), start, end, exclude_event_id=event_id)
+    if conflicts:
+        conflict_start, conflict_end, conflict_event_id = conflicts[0]
+        title = db.query(Event.title).filter(Event.id == conflict_event_id).scalar()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Salle '{room.name}' déjà réservée par '{title}' du "
+                   f"{conflict_start.strftime('%d/%m/%Y %H:%M')} au {conflict_end.strftime('%d/%m/%Y %H:%M')}"
+        )
+
+    room.calendar_version += 1
+    return room
+
+def release_room(db: Session, room_id: str) -> Optional[Room]:
+    """Libération d'une réservation : seule la version de la salle change en base"""
+    room = db.query(Room).filter(Room.id == room_id).with_for_update().first()
+    if room:
+        room.calendar_version += 1
+    return room
+
+@app.get("/api/rooms", response_model=ApiResponse)
+def get_rooms(
+    include_inactive: bool = False,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    query = db.query(Room)
+    if not include_inactive:
+        query = query.filter(Room.is_active == True)
+    rooms = query.order_by(Room.name).all()
+
+    return ApiResponse(
+        data=[room_to_response(room) for room in rooms],
+        message="Rooms retrieved successfully",
+        success=True
+    )
+
+@app.post("/api/rooms", response_model=ApiResponse)
+def create_room(
+    room: RoomCreate,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    if db.query(Room).filter(Room.name == room.name).first():
+        raise HTTPException(status_code=400, detail="Une salle porte déjà ce nom")
+
+    db_room = Room(**room.dict())
+    db.add(db_room)
+    db.commit()
+    db.refresh(db_room)
+
+    return ApiResponse(
+        data=room_to_response(db_room),
+        message="Room created successfully",
+        success=True
+    )
+
+@app.put("/api/rooms/{room_id}", response_model=ApiResponse)
+def update_room(
+    room_id: str,
+    room: RoomUpdate,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    db_room = db.query(Room).filter(Room.id == room_id).first()
+    if not db_room:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+
+    for field, value in room.dict(exclude_unset=True).items():
+        setattr(db_room, field, value)
+    db.commit()
+    db.refresh(db_room)
+
+    return ApiResponse(
+        data=room_to_response(db_room),
+        message="Room updated successfully",
+        success=True
+    )
+
+@app.delete("/api/rooms/{room_id}")
+def delete_room(
+    room_id: str,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    """Désactivation d'une salle : les événements existants conservent leur réservation"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    db_room = db.query(Room).filter(Room.id == room_id).first()
+    if not db_room:
+        raise HTTPException(status_code=404, detail="Salle non trouvée")
+
+    db_room.is_active = False
+    db.commit()
+
+    return {"message": "Room deactivated successfully"}
+
+@app.get("/api/rooms/availability", response_model=ApiResponse)
+def get_room_availability(
+    start: datetime,
+    end: datetime,
+    min_capacity: Optional[int] = Query(None, ge=1),
+    room_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    """Disponibilité des salles sur une période, avec leurs réservations"""
+    if end <= start:
+        raise HTTPException(status_code=400, detail="La fin doit être postérieure au début")
+
+    query = db.query(Room).filter(Room.is_active == True)
+    if room_id:
+        query = query.filter(Room.id == room_id)
+    if min_capacity:
+        query = query.filter(or_(Room.capacity == None, Room.capacity >= min_capacity))
+    rooms = query.order_by(Room.name).all()
+
+    ensure_room_calendars(db, rooms)
+    bookings = {str(room.id): room_calendar.bookings_between(str(room.id), start, end) for room in rooms}
+    event_ids = {event_id for room_bookings in bookings.values() for _, _, event_id in room_bookings}
+    titles = dict(db.query(Event.id, Event.title).filter(Event.id.in_(event_ids)).all()) if event_ids else {}
+    titles = {str(event_id): title for event_id, title in titles.items()}
+
+    return ApiResponse(
+        data=[
+            {
+                "room": room_to_response(room),
+                "is_free": not bookings[str(room.id)],
+                "bookings": [
+                    {"event_id": event_id, "title": titles.get(event_id), "start_date": booking_start, "end_date": booking_end}
+                    for booking_start, booking_end, event_id in bookings[str(room.id)]
+                ]
+            }
+            for room in rooms
+        ],
+        message="Room availability retrieved successfully",
+        success=True
+    )
+
+# Leave ledger
+LEDGER_CREDIT_TYPES = ["entitlement", "accrual", "adjustment"]
+LEDGER_DEBIT_TYPES = ["consumption", "reversal"]
+
+class LedgerEntryRequest(BaseModel):
+    employee_ids: List[str] = Field(default_factory=list, max_length=20000)
+    department: Optional[str] = None
+    leave_type: LeaveType
+    year: int = Field(..., ge=2000, le=2100)
+    days: float
+    entry_type: str = Field("entitlement", pattern="^(entitlement|accrual|adjustment)$")
+    description: Optional[str] = None
+
+class LeaveBalanceResponse(BaseModel):
+    employee_id: str
+    leave_type: LeaveType
+    year: int
+    entitled_days: float
+    used_days: float
+    remaining_days: float
+
+class LedgerEntryResponse(BaseModel):
+    id: str
+    leave_type: LeaveType
+    year: int
+    entry_type: str
+    days: float
+    leave_request_id: Optional[str] = None
+    description: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime
+
+def dialect_insert(db: Session, model):
+    """INSERT avec support de ON CONFLICT selon le dialecte (PostgreSQL ou SQLite)"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_specific_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_specific_insert
+    return dialect_specific_insert(model)
+
+def leave_days_by_year(start_date: datetime, end_date: datetime) -> Dict[int, float]:
+    """Durée d'un congé en jours ouvrés (date de fin incluse), répartie par année civile"""
+    calendar = get_business_calendar(config.HOLIDAY_CALENDAR)
+    return {
+        year: float(days)
+        for year, days in calendar.working_days_by_year(start_date.date(), end_date.date()).items()
+        if days
+    }
+
+def leave_consumption_entries(leaves: List[LeaveRequest], created_by: Optional[str] = None) -> List[dict]:
+    """Écritures de consommation des congés approuvés"""
+    return [
+        {
+            "employee_id": leave.employee_id,
+            "leave_type": leave.type,
+            "year": year,
+            "entry_type": "consumption",
+            "days": -days,
+            "leave_request_id": leave.id,
+            "description": f"Congé du {leave.start_date.strftime('%d/%m/%Y')} au {leave.end_date.strftime('%d/%m/%Y')}",
+            "created_by": created_by,
+        }
+        for leave in leaves
+        for year, days in leave_days_by_year(leave.start_date, leave.end_date).items()
+    ]
+
+def leave_reversal_entries(db: Session, leave_ids: List[str], created_by: Optional[str] = None) -> List[dict]:
+    """Écritures d'annulation du solde net consommé par des demandes (une requête groupée)"""
+    if not leave_ids:
+        return []
+    rows = db.query(
+        LeaveLedgerEntry.leave_request_id, LeaveLedgerEntry.employee_id,
+        LeaveLedgerEntry.leave_type, LeaveLedgerEntry.year, func.sum(LeaveLedgerEntry.days)
+    ).filter(
+        LeaveLedgerEntry.leave_request_id.in_(leave_ids),
+        LeaveLedgerEntry.entry_type.in_(LEDGER_DEBIT_TYPES)
+    ).group_by(
+        LeaveLedgerEntry.leave_request_id, LeaveLedgerEntry.employee_id,
+        LeaveLedgerEntry.leave_type, LeaveLedgerEntry.year
+    ).all()
+    return [
+        {
+            "employee_id": employee_id,
+            "leave_type": leave_type,
+            "year": year,
+            "entry_type": "reversal",
+            "days": -net_days,
+            "leave_request_id": leave_request_id,
+            "description": "Annulation de la consommation",
+            "created_by": created_by,
+        }
+        for leave_request_id, employee_id, leave_type, year, net_days in rows
+        if net_days
+    ]
+
+def post_ledger_entries(db: Session, entries: List[dict]):
+    """Écriture au grand livre et mise à jour incrémentale des soldes, dans la transaction courante
+
+    Les soldes manquants sont créés en une instruction (ON CONFLICT DO NOTHING), puis les
+    variations sont appliquées par UPDATE atomiques regroupés par montant identique.
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+
+    balance_keys = {(entry["employee_id"], entry["leave_type"], entry["year"]) for entry in entries}
+    db.execute(
+        dialect_insert(db, LeaveBalance).values([
+            {"id": uuid4(), "employee_id": employee_id, "leave_type": leave_type, "year": year,
+             "entitled_days": 0, "used_days": 0, "updated_at": now}
+            for employee_id, leave_type, year in balance_keys
+        ]).on_conflict_do_nothing(index_elements=["employee_id", "leave_type", "year"])
+    )
+
+    deltas: Dict[tuple, float] = {}
+    for entry in entries:
+        if entry["entry_type"] in LEDGER_CREDIT_TYPES:
+            key = (entry["employee_id"], entry["leave_type"], entry["year"], "entitled_days")
+            deltas[key] = deltas.get(key, 0) + entry["days"]
+        else:
+            key = (entry["employee_id"], entry["leave_type"], entry["year"], "used_days")
+            deltas[key] = deltas.get(key, 0) - entry["days"]
+
+    groups: Dict[tuple, list] = {}
+    for (employee_id, leave_type, year, column), amount in deltas.items():
+        if amount:
+            groups.setdefault((leave_type, year, column, amount), []).append(employee_id)
+    for (leave_type, year, column, amount), employee_ids in groups.items():
+        db.execute(
+            update(LeaveBalance)
+            .where(
+                LeaveBalance.employee_id.in_(employee_ids),
+                LeaveBalance.leave_type == leave_type,
+                LeaveBalance.year == year
+            )
+            .values({column: getattr(LeaveBalance, column) + amount, "updated_at": now})
+            .execution_options(synchronize_session=False)
+        )
+
+    db.execute(insert(LeaveLedgerEntry), [dict(entry, id=uuid4(), created_at=now) for entry in entries])
+
+def sync_leave_ledger(db: Session, previous: Optional[tuple], leave: LeaveRequest,
+                      deleted: bool = False, created_by: Optional[str] = None):
+    """Répercussion d'un changement de congé sur le grand livre, avant le commit
+
+    Un congé approuvé consomme son solde ; un congé qui perd son approbation, change de
+    dates ou de type, ou est supprimé, voit sa consommation annulée (puis recalculée).
+    """
+    if not deleted and previous == leave_snapshot(leave):
+        return
+    entries = []
+    if previous and previous[0] == LeaveStatus.approved:
+        entries += leave_reversal_entries(db, [leave.id], created_by)
+    if not deleted and leave.status == LeaveStatus.approved:
+        entries += leave_consumption_entries([leave], created_by)
+    post_ledger_entries(db, entries)
+
+def post_missing_leave_consumption(db: Session, employee_id: Optional[str] = None,
+                                   batch_size: int = 1000) -> int:
+    """Consommation des congés approuvés sans aucune écriture au grand livre (approuvés avant sa mise en place)
+
+    Idempotent : une demande qui a déjà une écriture de consommation ou d'annulation
+    est ignorée. Écrit dans la transaction courante ; retourne le nombre de demandes.
+    """
+    leaves = db.query(
+        LeaveRequest.id, LeaveRequest.employee_id, LeaveRequest.type,
+        LeaveRequest.start_date, LeaveRequest.end_date
+    ).filter(
+        LeaveRequest.status == LeaveStatus.approved,
+        ~exists().where(
+            LeaveLedgerEntry.leave_request_id == LeaveRequest.id,
+            LeaveLedgerEntry.entry_type.in_(LEDGER_DEBIT_TYPES)
+        )
+    )
+    if employee_id:
+        leaves = leaves.filter(LeaveRequest.employee_id == employee_id)
+    leaves = leaves.order_by(LeaveRequest.id).all()
+    for offset in range(0, len(leaves), batch_size):
+        post_ledger_entries(db, leave_consumption_entries(leaves[offset:offset + batch_size], created_by="system"))
+    return len(leaves)
+
+LEAVE_LEDGER_BACKFILL_JOB = "leave_ledger_backfill"
+
+def backfill_leave_ledger() -> Optional[int]:
+    """Reprise unique, au démarrage, des congés approuvés avant le grand livre (session dédiée)
+
+    La ligne du traitement dans job_watermarks sérialise les processus qui démarrent
+    ensemble ; son filigrane marque la reprise comme faite.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            dialect_insert(db, JobWatermark)
+            .values(name=LEAVE_LEDGER_BACKFILL_JOB, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        job = db.query(JobWatermark).filter(JobWatermark.name == LEAVE_LEDGER_BACKFILL_JOB).with_for_update().one()
+        if job.watermark is not None:
+            db.commit()
+            return None
+        posted = post_missing_leave_consumption(db)
+        job.watermark = datetime.utcnow()
+        db.commit()
+        return posted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def recompute_leave_balances(db: Session, employee_id: Optional[str] = None) -> dict:
+    """Vérification complète du grand livre et correction des soldes dérivés
+
+    Les congés approuvés sans aucune écriture reçoivent d'abord leur consommation ;
+    les soldes sont ensuite recalculés à partir des écritures, et les congés approuvés
+    dont la consommation nette ne correspond pas à leur durée sont signalés.
+    """
+    backfilled = post_missing_leave_consumption(db, employee_id)
+    db.flush()
+    ledger = db.query(
+        LeaveLedgerEntry.employee_id, LeaveLedgerEntry.leave_type, LeaveLedgerEntry.year,
+        func.sum(case((LeaveLedgerEntry.entry_type.in_(LEDGER_CREDIT_TYPES), LeaveLedgerEntry.days), else_=0)),
+        func.sum(case((LeaveLedgerEntry.entry_type.in_(LEDGER_DEBIT_TYPES), -LeaveLedgerEntry.days), else_=0))
+    ).group_by(LeaveLedgerEntry.employee_id, LeaveLedgerEntry.leave_type, LeaveLedgerEntry.year)
+    balances = db.query(LeaveBalance)
+    if employee_id:
+        ledger = ledger.filter(LeaveLedgerEntry.employee_id == employee_id)
+        balances = balances.filter(LeaveBalance.employee_id == employee_id)
+
+    expected = {
+        (str(row_employee_id), leave_type, year): (float(entitled or 0), float(used or 0))
+        for row_employee_id, leave_type, year, entitled, used in ledger.all()
+    }
+    current = {(str(balance.employee_id), balance.leave_type, balance.year): balance for balance in balances.all()}
+
+    corrected = []
+    for key in expected.keys() | current.keys():
+        entitled, used = expected.get(key, (0.0, 0.0))
+        balance = current.get(key)
+        if balance is None:
+            balance = LeaveBalance(employee_id=key[0], leave_type=key[1], year=key[2], entitled_days=0, used_days=0)
+            db.add(balance)
+        if balance.entitled_days != entitled or balance.used_days != used:
+            corrected.append({
+                "employee_id": key[0],
+                "leave_type": key[1],
+                "year": key[2],
+                "entitled_days": {"before": balance.entitled_days, "after": entitled},
+                "used_days": {"before": balance.used_days, "after": used},
+            })
+            balance.entitled_days = entitled
+            balance.used_days = used
+
+    # Consommation nette par demande comparée à la durée des congés approuvés
+    consumed: Dict[str, float] = {}
+    net = db.query(LeaveLedgerEntry.leave_request_id, func.sum(LeaveLedgerEntry.days)).filter(
+        LeaveLedgerEntry.leave_request_id != None,
+        LeaveLedgerEntry.entry_type.in_(LEDGER_DEBIT_TYPES)
+    )
+    leaves = db.query(LeaveRequest.id, LeaveRequest.status, LeaveRequest.start_date, LeaveRequest.end_date)
+    if employee_id:
+        net = net.filter(LeaveLedgerEntry.employee_id == employee_id)
+        leaves = leaves.filter(LeaveRequest.employee_id == employee_id)
+    for leave_request_id, days in net.group_by(LeaveLedgerEntry.leave_request_id).all():
+        consumed[str(leave_request_id)] = -float(days or 0)
+
+    # Durées attendues des congés approuvés, calculées en une fois sur le calendrier des jours ouvrés
+    leaves = leaves.all()
+    approved = [leave for leave in leaves if leave.status == LeaveStatus.approved]
+    durations = get_business_calendar(config.HOLIDAY_CALENDAR).working_days_batch(
+        [leave.start_date.date() for leave in approved],
+        [leave.end_date.date() for leave in approved]
+    )
+    expected = {leave.id: float(days) for leave, days in zip(approved, durations)}
+
+    mismatched = []
+    for leave_id, status, start_date, end_date in leaves:
+        expected_days = expected.get(leave_id, 0.0)
+        if consumed.get(str(leave_id), 0.0) != expected_days:
+            mismatched.append({
+                "leave_request_id": str(leave_id),
+                "status": status,
+                "expected_days": expected_days,
+                "ledger_days": consumed.get(str(leave_id), 0.0),
+            })
+
+    db.commit()
+    return {"balances": corrected, "leaves": mismatched, "backfilled_leaves": backfilled}
+
+def balance_to_response(balance: LeaveBalance) -> LeaveBalanceResponse:
+    return LeaveBalanceResponse(
+        employee_id=str(balance.employee_id),
+        leave_type=balance.leave_type,
+        year=balance.year,
+        entitled_days=balance.entitled_days,
+        used_days=balance.used_days,
+        remaining_days=balance.entitled_days - balance.used_days
+    )
+
+@app.get("/api/leave-balances/{employee_id}", response_model=ApiResponse[List[LeaveBalanceResponse]])
+def get_leave_balances(
+    employee_id: str,
+    year: Optional[int] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Soldes de congés d'un employé : lecture directe des soldes maintenus"""
+    if str(current_user.id) != employee_id and current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Accès non autorisé")
+
+    query = db.query(LeaveBalance).filter(LeaveBalance.employee_id == employee_id)
+    if year:
+        query = query.filter(LeaveBalance.year == year)
+    balances = query.order_by(LeaveBalance.year.desc(), LeaveBalance.leave_type).all()
+
+    return ApiResponse(
+        success=True,
+        message="Soldes récupérés",
+        data=[balance_to_response(balance) for balance in balances]
+    )
+
+@app.get("/api/leave-balances/{employee_id}/ledger", response_model=ApiResponse[List[LedgerEntryResponse]])
+def get_leave_ledger(
+    employee_id: str,
+    year: Optional[int] = None,
+    leave_type: Optional[LeaveType] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Historique des écritures du grand livre de congés d'un employé"""
+    if str(current_user.id) != employee_id and current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Accès non autorisé")
+
+    query = db.query(LeaveLedgerEntry).filter(LeaveLedgerEntry.employee_id == employee_id)
+    if year:
+        query = query.filter(LeaveLedgerEntry.year == year)
+    if leave_type:
+        query = query.filter(LeaveLedgerEntry.leave_type == leave_type)
+    entries = query.order_by(LeaveLedgerEntry.created_at).all()
+
+    return ApiResponse(
+        success=True,
+        message="Écritures récupérées",
+        data=[
+            LedgerEntryResponse(
+                id=str(entry.id),
+                leave_type=entry.leave_type,
+                year=entry.year,
+                entry_type=entry.entry_type,
+                days=entry.days,
+                leave_request_id=str(entry.leave_request_id) if entry.leave_request_id else None,
+                description=entry.description,
+                created_by=entry.created_by,
+                created_at=entry.created_at
+            )
+            for entry in entries
+        ]
+    )
+
+@app.post("/api/leave-balances/entries")
+def post_leave_entitlements(
+    request: LedgerEntryRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Attribution de droits, acquisitions ou ajustements pour une liste d'employés ou un département"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    employees = resolve_employee_selection(db, request.employee_ids, request.department)
+    if not employees:
+        raise HTTPException(status_code=400, detail="Liste d'employés ou département requis")
+
+    post_ledger_entries(db, [
+        {
+            "employee_id": employee.id,
+            "leave_type": request.leave_type,
+            "year": request.year,
+            "entry_type": request.entry_type,
+            "days": request.days,
+            "leave_request_id": None,
+            "description": request.description,
+            "created_by": str(current_user.id),
+        }
+        for employee in employees
+    ])
+    db.commit()
+
+    logger.info(f"Leave ledger: {request.entry_type} of {request.days} day(s) for {len(employees)} employee(s) by user {current_user.id}")
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(employees)} écriture(s) enregistrée(s)",
+        data={"employees": len(employees)}
+    )
+
+@app.post("/api/leave-balances/recompute")
+def recompute_leave_balances_endpoint(
+    employee_id: Optional[str] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Recalcul complet des soldes à partir du grand livre (HR)"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    result = recompute_leave_balances(db, employee_id)
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(result['balances'])} solde(s) corrigé(s), {len(result['leaves'])} congé(s) incohérent(s), "
+                f"{result['backfilled_leaves']} consommation(s) reprise(s)",
+        data=result
+    )
+
+# Absence heatmap
+absence_heatmap_cache = AbsenceHeatmapCache()
+
+def compute_absence_heatmap(db: Session, department: Optional[str], start: date, end: date) -> dict:
+    """Absents par département et par jour : deux requêtes et un tableau de différences"""
+    period_start = datetime.combine(start, datetime.min.time())
+    period_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    leaves = db.query(Employee.department, LeaveRequest.start_date, LeaveRequest.end_date).join(
+        Employee, Employee.id == LeaveRequest.employee_id
+    ).filter(
+        LeaveRequest.status == LeaveStatus.approved,
+        Employee.is_active == True,
+        LeaveRequest.start_date < period_end,
+        LeaveRequest.end_date >= period_start
+    )
+    headcounts = db.query(Employee.department, func.count(Employee.id)).filter(Employee.is_active == True)
+    if department:
+        leaves = leaves.filter(Employee.department == department)
+        headcounts = headcounts.filter(Employee.department == department)
+    leaves = leaves.all()
+    headcount_by_department = dict(headcounts.group_by(Employee.department).all())
+
+    departments = sorted(headcount_by_department.keys() | {row.department for row in leaves})
+    department_index = {name: index for index, name in enumerate(departments)}
+    counts = daily_absence_counts(
+        start, end,
+        np.array([department_index[row.department] for row in leaves], dtype=np.int64),
+        [row.start_date.date() for row in leaves],
+        [row.end_date.date() for row in leaves],
+        len(departments)
+    )
+
+    dates = [start + timedelta(days=offset) for offset in range(counts.shape[1])]
+    heatmap = []
+    for name, row in zip(departments, counts):
+        headcount = headcount_by_department.get(name, 0)
+        peak = int(row.argmax()) if len(row) else 0
+        heatmap.append({
+            "department": name,
+            "headcount": headcount,
+            "absent": row.tolist(),
+            "absence_rate": (np.round(row / headcount * 100, 1).tolist() if headcount else [0.0] * len(row)),
+            "peak": {"date": dates[peak], "absent": int(row[peak])} if len(row) else None,
+        })
+
+    return {"start": start, "end": end, "dates": dates, "departments": heatmap}
+
+@app.get("/api/absence-heatmap")
+def get_absence_heatmap(
+    start: date,
+    end: date,
+    department: Optional[str] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Carte de chaleur des absences (personnes en congé approuvé) par département et par jour"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="La fin doit être postérieure au début")
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Période limitée à un an")
+
+    # Hors HR, seul le département de l'utilisateur est visible
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        if department and department != current_user.department:
+            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        department = current_user.department
+
+    heatmap = absence_heatmap_cache.get(department, start, end)
+    if heatmap is None:
+        heatmap = compute_absence_heatmap(db, department, start, end)
+        absence_heatmap_cache.put(department, start, end, heatmap)
+
+    return ApiResponse(
+        success=True,
+        message="Carte des absences calculée",
+        data=heatmap
+    )
+
+# Business days
+@app.get("/api/business-days")
+def get_business_days(
+    start: date,
+    end: date,
+    calendar: Optional[str] = None,
+    current_user: Employee = Depends(get_current_user)
+):
+    """Nombre de jours ouvrés entre deux dates incluses, week-ends et jours fériés exclus"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="La fin doit être postérieure au début")
+    code = calendar or config.HOLIDAY_CALENDAR
+    if code not in HOLIDAY_CALENDARS:
+        raise HTTPException(status_code=400, detail=f"Calendrier inconnu : {code}")
+
+    business_calendar = get_business_calendar(code)
+    holidays = sorted(
+        holiday
+        for year in range(start.year, end.year + 1)
+        for holiday in business_calendar.holidays(year)
+        if start <= holiday <= end
+    )
+    return ApiResponse(
+        success=True,
+        message="Jours ouvrés calculés",
+        data={
+            "start": start,
+            "end": end,
+            "calendar": code,
+            "working_days": business_calendar.working_days(start, end),
+            "by_year": business_calendar.working_days_by_year(start, end),
+            "holidays": holidays,
+        }
+    )
+
+# Minimum staffing
+class StaffingRuleBase(BaseModel):
+    min_present: int = Field(..., ge=0)
+    include_weekends: bool = False
+
+class StaffingRuleResponse(StaffingRuleBase):
+    department: str
+    updated_by: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+def staffing_checks(db: Session, leaves: List[tuple], cumulative: bool = False,
+                    override: bool = False) -> Dict[str, dict]:
+    """Effectif présent restant si chaque demande (id, département, début, fin) était approuvée
+
+    Les absences approuvées de tous les départements concernés sont cumulées une seule
+    fois par jour (tableau de différences puis somme cumulée) ; chaque demande se
+    contrôle ensuite sur une tranche du tableau, en O(jours). Seules les demandes
+    d'un département doté d'une règle figurent dans le résultat.
+
+    En mode cumulé (approbation d'un lot), les demandes sont contrôlées dans l'ordre
+    donné et chaque demande conforme compte parmi les absents des suivantes : deux
+    absences acceptables séparément peuvent ne plus l'être ensemble. Avec override,
+    les demandes non conformes sont approuvées quand même et comptent aussi.
+    """
+    departments = {department for _, department, _, _ in leaves if department}
+    rules = {
+        rule.department: rule
+        for rule in db.query(DepartmentStaffingRule).filter(DepartmentStaffingRule.department.in_(departments))
+    } if departments else {}
+    leaves = [leave for leave in leaves if leave[1] in rules]
+    if not leaves:
+        return {}
+
+    start = min(start_date.date() for _, _, start_date, _ in leaves)
+    end = max(end_date.date() for _, _, _, end_date in leaves)
+    departments = sorted(rules)
+    department_index = {name: index for index, name in enumerate(departments)}
+
+    absences = db.query(Employee.department, LeaveRequest.start_date, LeaveRequest.end_date).join(
+        Employee, Employee.id == LeaveRequest.employee_id
+    ).filter(
+        LeaveRequest.status == LeaveStatus.approved,
+        # Mêmes employés que l'effectif : un inactif n'est ni compté présent, ni absent
+        Employee.is_active == True,
+        Employee.department.in_(departments),
+        LeaveRequest.start_date < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        LeaveRequest.end_date >= datetime.combine(start, datetime.min.time())
+    ).all()
+    headcounts = dict(db.query(Employee.department, func.count(Employee.id)).filter(
+        Employee.is_active == True,
+        Employee.department.in_(departments)
+    ).group_by(Employee.department).all())
+
+    absent = daily_absence_counts(
+        start, end,
+        np.array([department_index[row.department] for row in absences], dtype=np.int64),
+        [row.start_date.date() for row in absences],
+        [row.end_date.date() for row in absences],
+        len(departments)
+    )
+    # Présents restants, le demandeur compris parmi les absents
+    headcount = np.array([headcounts.get(name, 0) for name in departments], dtype=np.int32)
+    present_after = headcount[:, None] - absent - 1
+    working = get_business_calendar(config.HOLIDAY_CALENDAR).working_mask(start, end)
+
+    results = {}
+    for leave_id, department, start_date, end_date in leaves:
+        rule = rules[department]
+        first = (start_date.date() - start).days
+        last = (end_date.date() - start).days + 1
+        present = present_after[department_index[department], first:last]
+        counted = np.ones(len(present), dtype=bool) if rule.include_weekends else working[first:last]
+        shortfall = np.flatnonzero(counted & (present < rule.min_present))
+        results[str(leave_id)] = {
+            "department": department,
+            "min_present": rule.min_present,
+            "headcount": int(headcount[department_index[department]]),
+            "lowest_present": int(present[counted].min()) if counted.any() else None,
+            "ok": len(shortfall) == 0,
+            "shortfall_days": [
+                {"date": start + timedelta(days=first + int(offset)), "present": int(present[offset])}
+                for offset in shortfall
+            ],
+        }
+        if cumulative and (override or len(shortfall) == 0):
+            present_after[department_index[department], first:last] -= 1
+    return results
+
+def staffing_shortfall_summary(staffing: dict) -> str:
+    shortfall = staffing["shortfall_days"]
+    return (f"effectif minimum de {staffing['min_present']} non respecté sur {len(shortfall)} jour(s), "
+            f"dont le {shortfall[0]['date'].strftime('%d/%m/%Y')} ({shortfall[0]['present']} présent(s))")
+
+def staffing_rule_to_response(rule: DepartmentStaffingRule) -> StaffingRuleResponse:
+    return StaffingRuleResponse(
+        department=rule.department,
+        min_present=rule.min_present,
+        include_weekends=rule.include_weekends,
+        updated_by=rule.updated_by,
+        updated_at=rule.updated_at
+    )
+
+@app.get("/api/staffing-rules", response_model=ApiResponse)
+def get_staffing_rules(
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    rules = db.query(DepartmentStaffingRule).order_by(DepartmentStaffingRule.department).all()
+    return ApiResponse(
+        data=[staffing_rule_to_response(rule) for rule in rules],
+        message="Staffing rules retrieved successfully",
+        success=True
+    )
+
+@app.put("/api/staffing-rules/{department}", response_model=ApiResponse)
+def set_staffing_rule(
+    department: str,
+    rule: StaffingRuleBase,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    """Création ou modification de l'effectif minimum d'un département"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    db_rule = db.query(DepartmentStaffingRule).filter(DepartmentStaffingRule.department == department).first()
+    if not db_rule:
+        db_rule = DepartmentStaffingRule(department=department)
+        db.add(db_rule)
+    db_rule.min_present = rule.min_present
+    db_rule.include_weekends = rule.include_weekends
+    db_rule.updated_by = str(current_user.id)
+    db.commit()
+    db.refresh(db_rule)
+
+    return ApiResponse(
+        data=staffing_rule_to_response(db_rule),
+        message="Staffing rule saved successfully",
+        success=True
+    )
+
+@app.delete("/api/staffing-rules/{department}")
+def delete_staffing_rule(
+    department: str,
+    db: Session = Depends(get_db),
+    current_user: Employee = Depends(get_current_user)
+):
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    deleted = db.query(DepartmentStaffingRule).filter(DepartmentStaffingRule.department == department).delete()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Règle non trouvée")
+    db.commit()
+
+    return {"message": "Staffing rule deleted successfully"}
+
+# Leave statistics
+LEAVE_STATISTICS_TTL_SECONDS = 60
+leave_statistics_cache: Dict[tuple, tuple] = {}
+
+@app.get("/api/leave-statistics")
+def get_leave_statistics(
+    employee_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Statistiques des congés (tableau de bord) en une seule requête GROUP BY, mises en cache"""
+    if current_user.role not in ["hr_officer", "hr_head"]:
+        if employee_id and employee_id != str(current_user.id):
+            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        employee_id = str(current_user.id)
+
+    cache_key = (employee_id, start_date, end_date)
+    cached = leave_statistics_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < LEAVE_STATISTICS_TTL_SECONDS:
+        statistics = cached[1]
+    else:
+        start_year = extract('year', LeaveRequest.start_date)
+        start_month = extract('month', LeaveRequest.start_date)
+        query = db.query(
+            LeaveRequest.status, LeaveRequest.type, Employee.department,
+            start_year, start_month, func.count(LeaveRequest.id)
+        ).join(Employee, Employee.id == LeaveRequest.employee_id)
+        if employee_id:
+            query = query.filter(LeaveRequest.employee_id == employee_id)
+        if start_date:
+            query = query.filter(LeaveRequest.end_date >= start_date)
+        if end_date:
+            query = query.filter(LeaveRequest.start_date <= end_date)
+
+        statistics = summarize_leave_groups(query.group_by(
+            LeaveRequest.status, LeaveRequest.type, Employee.department, start_year, start_month
+        ).all())
+        if len(leave_statistics_cache) >= 256:
+            leave_statistics_cache.clear()
+        leave_statistics_cache[cache_key] = (time.monotonic(), statistics)
+
+    return ApiResponse(
+        success=True,
+        message="Statistiques des congés calculées",
+        data=statistics
+    )
+
+# Bulk leave decisions
+class LeaveDecision(BaseModel):
+    leave_id: str
+    decision: str = Field(..., pattern="^(approve|reject)$")
+    rejection_reason: Optional[str] = None
+
+class BulkLeaveDecisionRequest(BaseModel):
+    decisions: List[LeaveDecision] = Field(..., min_length=1, max_length=5000)
+    decided_by: Optional[str] = None
+    override_staffing: bool = False
+
+@app.post("/api/leaves/bulk-decision")
+def decide_leaves_bulk(
+    request: BulkLeaveDecisionRequest,
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Approbation / rejet groupés de demandes de congé en une transaction
+
+    Les UPDATE ne portent que sur les demandes encore en attente : une demande traitée
+    entre-temps par quelqu'un d'autre est ignorée et signalée. L'effectif minimum est
+    contrôlé sur l'ensemble du lot (demandes les plus anciennes d'abord) : une demande
+    qui le ferait tomber sous la règle reste en attente, sauf override_staffing.
+    Comme dans la boîte de réception, un manager ne statue que sur les demandes de son
+    département, jamais sur les siennes : les autres sont ignorées et signalées.
+    Consommations au grand livre et notifications sont écrites en lot dans la même
+    transaction.
+    """
+    if current_user.role not in ["manager", "hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    scope = []
+    if current_user.role == "manager":
+        scope = [
+            LeaveRequest.employee_id.in_(select(Employee.id).where(Employee.department == current_user.department)),
+            LeaveRequest.employee_id != current_user.id
+        ]
+
+    decided_by = request.decided_by or current_user.name
+    now = datetime.utcnow()
+    returned_columns = (LeaveRequest.id, LeaveRequest.employee_id, LeaveRequest.type,
+                        LeaveRequest.start_date, LeaveRequest.end_date)
+
+    # Une décision par demande : la dernière l'emporte
+    decisions = {decision.leave_id: decision for decision in request.decisions}
+    approve_ids = [leave_id for leave_id, decision in decisions.items() if decision.decision == "approve"]
+    reject_groups: Dict[Optional[str], List[str]] = {}
+    for leave_id, decision in decisions.items():
+        if decision.decision == "reject":
+            reject_groups.setdefault(decision.rejection_reason, []).append(leave_id)
+
+    understaffed = []
+    if approve_ids:
+        candidates = db.query(
+            LeaveRequest.id, Employee.department, LeaveRequest.start_date, LeaveRequest.end_date
+        ).join(Employee, Employee.id == LeaveRequest.employee_id).filter(
+            LeaveRequest.id.in_(approve_ids),
+            LeaveRequest.status == LeaveStatus.pending,
+            *scope
+        ).order_by(LeaveRequest.created_at, LeaveRequest.id).with_for_update(of=LeaveRequest).all()
+        staffing = staffing_checks(db, [tuple(row) for row in candidates], cumulative=True,
+                                   override=request.override_staffing)
+        for leave_id, check in staffing.items():
+            if check["ok"]:
+                continue
+            summary = staffing_shortfall_summary(check)
+            understaffed.append({"leave_id": leave_id, "department": check["department"],
+                                 "approved": request.override_staffing, "detail": summary})
+            if request.override_staffing:
+                logger.warning(f"Leave {leave_id} approved below minimum staffing by user {current_user.id}: {summary}")
+        blocked = {item["leave_id"] for item in understaffed if not item["approved"]}
+        approve_ids = [str(row.id) for row in candidates if str(row.id) not in blocked]
+
+    approved = []
+    if approve_ids:
+        approved = db.execute(
+            update(LeaveRequest)
+            .where(LeaveRequest.id.in_(approve_ids), LeaveRequest.status == LeaveStatus.pending)
+            .values(status=LeaveStatus.approved, approved_by=decided_by,
+                    manager_approval=True, hr_approval=True, updated_at=now)
+            .returning(*returned_columns)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    rejected = []
+    for rejection_reason, leave_ids in reject_groups.items():
+        rejected += db.execute(
+            update(LeaveRequest)
+            .where(LeaveRequest.id.in_(leave_ids), LeaveRequest.status == LeaveStatus.pending, *scope)
+            .values(status=LeaveStatus.rejected, approved_by=decided_by,
+                    rejection_reason=rejection_reason, updated_at=now)
+            .returning(*returned_columns)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    # Les demandes en attente n'ont rien consommé : seule l'approbation écrit au grand livre
+    post_ledger_entries(db, leave_consumption_entries(approved, created_by=decided_by))
+
+    notifications = [
+        {
+            "id": uuid4(),
+            "user_id": row.employee_id,
+            "type": NotificationType.leave_approval,
+            "title": "Congé approuvé",
+            "message": f"Votre demande de congé du {row.start_date.strftime('%d/%m/%Y')} au "
+                       f"{row.end_date.strftime('%d/%m/%Y')} a été approuvée.",
+            "read": False,
+            "created_at": now,
+        }
+        for row in approved
+    ] + [
+        {
+            "id": uuid4(),
+            "user_id": row.employee_id,
+            "type": NotificationType.leave_rejection,
+            "title": "Congé refusé",
+            "message": f"Votre demande de congé du {row.start_date.strftime('%d/%m/%Y')} au "
+                       f"{row.end_date.strftime('%d/%m/%Y')} a été refusée.",
+            "read": False,
+            "created_at": now,
+        }
+        for row in rejected
+    ]
+    if notifications:
+        db.execute(insert(Notification), notifications)
+    db.commit()
+
+    for row in approved:
+        availability_index.mark_busy(str(row.employee_id), *leave_interval(row.start_date, row.end_date))
+    if approved:
+        absence_heatmap_cache.invalidate(min(row.start_date for row in approved).date(),
+                                         max(row.end_date for row in approved).date())
+
+    processed = {str(row.id) for row in approved} | {str(row.id) for row in rejected}
+    blocked = {item["leave_id"] for item in understaffed if not item["approved"]}
+    skipped = [leave_id for leave_id in decisions if leave_id not in processed and leave_id not in blocked]
+
+    logger.info(f"Bulk leave decision: {len(approved)} approved, {len(rejected)} rejected, "
+                f"{len(skipped)} skipped by user {current_user.id}")
+
+    return ApiResponse(
+        success=True,
+        message=f"{len(approved)} congé(s) approuvé(s), {len(rejected)} refusé(s), "
+                f"{len(blocked)} en sous-effectif, {len(skipped)} ignoré(s)",
+        data={
+            "approved": [str(row.id) for row in approved],
+            "rejected": [str(row.id) for row in rejected],
+            "understaffed": understaffed,
+            "skipped": skipped
+        }
+    )
+
+# Approver inbox
+class InboxLeaveItem(BaseModel):
+    id: str
+    employee_id: str
+    employee_name: str
+    department: Optional[str] = None
+    type: LeaveType
+    start_date: datetime
+    end_date: datetime
+    reason: str
+    created_at: datetime
+    age_days: int
+    # Contrôle d'effectif minimum si la demande et les demandes plus anciennes de la boîte
+    # étaient approuvées (None sans règle pour le département)
+    staffing: Optional[Dict[str, Any]] = None
+
+def decode_inbox_cursor(cursor: str) -> tuple:
+    """Curseur de pagination « created_at|id » de la dernière demande reçue"""
+    try:
+        created_at, leave_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), str(uuid.UUID(leave_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+@app.get("/api/leave-inbox")
+def get_leave_inbox(
+    department: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Employee = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Demandes en attente de décision pour l'approbateur, les plus anciennes d'abord
+
+    Pagination par curseur (created_at, id) : chaque page est un parcours de l'index
+    partiel des demandes en attente, sans OFFSET.
+    """
+    if current_user.role == "manager":
+        if department and department != current_user.department:
+            raise HTTPException(status_code=403, detail="Accès non autorisé")
+        department = current_user.department
+    elif current_user.role not in ["hr_officer", "hr_head"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+
+    query = db.query(
+        LeaveRequest.id, LeaveRequest.employee_id, Employee.name, LeaveRequest.department,
+        LeaveRequest.type, LeaveRequest.start_date, LeaveRequest.end_date,
+        LeaveRequest.reason, LeaveRequest.created_at
+    ).join(Employee, Employee.id == LeaveRequest.employee_id).filter(
+        LeaveRequest.status == LeaveStatus.pending,
+        # Personne ne statue sur ses propres demandes
+        LeaveRequest.employee_id != current_user.id
+    )
+    if department:
+        query = query.filter(LeaveRequest.department == department)
+    if cursor:
+        cursor_created_at, cursor_id = decode_inbox_cursor(cursor)
+        query = query.filter(or_(
+            LeaveRequest.created_at > cursor_created_at,
+            and_(LeaveRequest.created_at == cursor_created_at, LeaveRequest.id > cursor_id)
+        ))
+
+    rows = query.order_by(LeaveRequest.created_at, LeaveRequest.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Contrôle cumulé, comme une approbation dans l'ordre de la boîte : chaque demande tient
+    # compte des demandes en attente plus anciennes du même département (pages précédentes comprises)
+    staffing = {}
+    departments = {row.department for row in rows if row.department}
+    if departments:
+        last = rows[-1]
+        queue = db.query(
+            LeaveRequest.id, LeaveRequest.department, LeaveRequest.start_date, LeaveRequest.end_date
+        ).filter(
+            LeaveRequest.status == LeaveStatus.pending,
+            LeaveRequest.department.in_(departments),
+            or_(
+                LeaveRequest.created_at < last.created_at,
+                and_(LeaveRequest.created_at == last.created_at, LeaveRequest.id <= last.id)
+            ),
+            LeaveRequest.start_date <= max(row.end_date for row in rows),
+            LeaveRequest.end_date >= min(row.start_date for row in rows)
+        ).order_by(LeaveRequest.created_at, LeaveRequest.id).all()
+        staffing = staffing_checks(db, [tuple(row) for row in queue], cumulative=True)
+
+    now = datetime.utcnow()
+    return ApiResponse(
+        success=True,
+        message=f"{len(rows)} demande(s) en attente",
+        data={
+            "items": [
+                InboxLeaveItem(
+                    id=str(row.id),
+                    employee_id=str(row.employee_id),
+                    employee_name=row.name,
+                    department=row.department,
+                    type=row.type,
+                    start_date=row.start_date,
+                    end_date=row.end_date,
+                    reason=row.reason,
+                    created_at=row.created_at,
+                    age_days=(now - row.created_at).days,
+                    staffing=staffing.get(str(row.id))
+                )
+                for row in rows
+            ],
+            "next_cursor": f"{rows[-1].created_at.isoformat()}|{rows[-1].id}" if has_more else None
+        }
+    )
+
 # Email Configuration
 EMAIL_CONFIG = {
     "enabled": os.getenv("EMAIL_ENABLED", "false").lower() == "true",
@@ -2434,9 +5685,20 @@ EMAIL_CONFIG = {
     "smtp_username": os.getenv("SMTP_USERNAME", ""),
     "smtp_password": os.getenv("SMTP_PASSWORD", ""),
     "from_email": os.getenv("FROM_EMAIL", "noreply@company.com"),
-    "use_tls": os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    "use_tls": os.getenv("SMTP_USE_TLS", "true").lower() == "true",
+    "pool_size": int(os.getenv("SMTP_POOL_SIZE", "4"))
 }
 
+# Connexions SMTP réutilisées d'un email à l'autre (STARTTLS et authentification une fois par connexion)
+smtp_pool = SMTPPool(
+    hostname=EMAIL_CONFIG["smtp_server"],
+    port=EMAIL_CONFIG["smtp_port"],
+    username=EMAIL_CONFIG["smtp_username"],
+    password=EMAIL_CONFIG["smtp_password"],
+    start_tls=EMAIL_CONFIG["use_tls"],
+    size=EMAIL_CONFIG["pool_size"]
+)
+
 # Push Notifications Configuration
 PUSH_CONFIG = {
     "enabled": os.getenv("PUSH_NOTIFICATIONS_ENABLED", "false").lower() == "true",
@@ -2449,6 +5711,34 @@ PUSH_CONFIG = {
 class NotificationService:
     """Service de gestion des notifications push et email"""
     
+    @staticmethod
+    def build_email_message(
+        to_email: str,
+        subject: str,
+        message: str,
+        html_content: str = None
+    ):
+        """Construction du message MIME (texte, et HTML si fourni)"""
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        # Création du message
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = EMAIL_CONFIG["from_email"]
+        msg['To'] = to_email
+        
+        # Contenu texte
+        text_part = MIMEText(message, 'plain', 'utf-8')
+        msg.attach(text_part)
+        
+        # Contenu HTML si fourni
+        if html_content:
+            html_part = MIMEText(html_content, 'html', 'utf-8')
+            msg.attach(html_part)
+        
+        return msg
+    
     @staticmethod
     async def send_email_notification(
         to_email: str,
@@ -2462,36 +5752,10 @@ class NotificationService:
             return False
         
         try:
-            import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-            
-            # Création du message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = EMAIL_CONFIG["from_email"]
-            msg['To'] = to_email
-            
-            # Contenu texte
-            text_part = MIMEText(message, 'plain', 'utf-8')
-            msg.attach(text_part)
+            msg = NotificationService.build_email_message(to_email, subject, message, html_content)
             
-            # Contenu HTML si fourni
-            if html_content:
-                html_part = MIMEText(html_content, 'html', 'utf-8')
-                msg.attach(html_part)
-            
-            # Connexion SMTP
-            server = smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"])
-            if EMAIL_CONFIG["use_tls"]:
-                server.starttls()
-            
-            # Authentification
-            server.login(EMAIL_CONFIG["smtp_username"], EMAIL_CONFIG["smtp_password"])
-            
-            # Envoi
-            server.send_message(msg)
-            server.quit()
+            # Envoi asynchrone sur une connexion du pool
+            await smtp_pool.send_message(msg)
             
             logger.info(f"Email envoyé avec succès à {to_email}")
             return True
@@ -2539,15 +5803,17 @@ class NotificationService:
                 return False
             
             # Récupération des participants
-            registrations = db.query(EventRegistration).filter(
+            employees = db.query(Employee).join(
+                EventRegistration, EventRegistration.employee_id == Employee.id
+            ).filter(
                 EventRegistration.event_id == event_id,
                 EventRegistration.status == "confirmed"
             ).all()
             
             # Envoi des rappels
-            for registration in registrations:
-                employee = db.query(Employee).filter(Employee.id == registration.employee_id).first()
-                if employee and employee.email:
+            emails = []
+            for employee in employees:
+                if employee.email:
                     # Email de rappel
                     subject = f"Rappel: {event.title} dans 1 heure"
                     message = f"""
@@ -2565,11 +5831,7 @@ class NotificationService:
                     L'équipe RH
                     """
                     
-                    await NotificationService.send_email_notification(
-                        employee.email,
-                        subject,
-                        message
-                    )
+                    emails.append(NotificationService.build_email_message(employee.email, subject, message))
                     
                     # Notification push
                     await NotificationService.send_push_notification(
@@ -2578,6 +5840,14 @@ class NotificationService:
                         f"{event.title} dans 1 heure"
                     )
             
+            # Emails envoyés en parallèle sur les connexions du pool
+            if emails and EMAIL_CONFIG["enabled"]:
+                errors = await smtp_pool.send_many(emails)
+                logger.info(f"Rappels de l'événement {event_id}: {len(emails) - sum(1 for e in errors if e)} "
+                            f"email(s) envoyé(s) sur {len(emails)}")
+            elif emails:
+                logger.warning("Service email désactivé")
+            
             return True
             
         except Exception as e:
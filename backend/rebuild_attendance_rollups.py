@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Script de reconstruction des tables de cumul de présence (attendance_rollups,
+employee_attendance_rollups) à partir des fiches de présence (attendance)
+"""
+
+from main import SessionLocal, rebuild_attendance_rollups
+
+def main():
+    """Reconstruit les cumuls par (département, type d'événement, mois) et par employé"""
+    print("🔧 Reconstruction des cumuls de présence...")
+
+    db = SessionLocal()
+
+    try:
+        result = rebuild_attendance_rollups(db)
+        print(f"✅ {result['groups']} cumul(s) par groupe, {result['employees']} cumul(s) par employé")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur: {str(e)}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
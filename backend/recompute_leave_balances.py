@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de vérification du grand livre des congés et de recalcul des soldes
+(leave_balances) à partir des écritures (leave_ledger_entries)
+"""
+
+import sys
+
+from main import SessionLocal, recompute_leave_balances
+
+def main():
+    """Recalcule les soldes d'un employé ou de tous les employés"""
+    employee_id = sys.argv[1] if len(sys.argv) > 1 else None
+    print("🔧 Vérification du grand livre des congés...")
+
+    db = SessionLocal()
+
+    try:
+        result = recompute_leave_balances(db, employee_id)
+
+        if result["backfilled_leaves"]:
+            print(f"📒 Consommation reprise pour {result['backfilled_leaves']} congé(s) approuvé(s) sans écriture")
+
+        for item in result["balances"]:
+            print(f"\n👤 Employé {item['employee_id']} - {item['leave_type']} {item['year']}")
+            print(f"   Droits: {item['entitled_days']['before']} → {item['entitled_days']['after']}")
+            print(f"   Consommés: {item['used_days']['before']} → {item['used_days']['after']}")
+
+        for item in result["leaves"]:
+            print(f"\n⚠️  Congé {item['leave_request_id']} ({item['status']}): "
+                  f"{item['expected_days']} jour(s) attendu(s), {item['ledger_days']} au grand livre")
+
+        if not result["balances"] and not result["leaves"]:
+            print("✅ Grand livre et soldes cohérents")
+        else:
+            print(f"\n✅ {len(result['balances'])} solde(s) corrigé(s), "
+                  f"{len(result['leaves'])} congé(s) incohérent(s) signalé(s)")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur: {str(e)}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script de réparation des compteurs de capacité des événements
+(confirmed_count / waitlist_count) à partir des inscriptions réelles
+"""
+
+import sys
+
+from main import SessionLocal, reconcile_event_counters
+
+def main():
+    """Réconcilie les compteurs d'un événement ou de tous les événements"""
+    event_id = sys.argv[1] if len(sys.argv) > 1 else None
+    print("🔧 Réconciliation des compteurs de capacité...")
+
+    db = SessionLocal()
+
+    try:
+        corrected = reconcile_event_counters(db, event_id)
+
+        if not corrected:
+            print("✅ Tous les compteurs sont cohérents")
+            return
+
+        for item in corrected:
+            print(f"\n📅 Événement {item['event_id']}")
+            print(f"   Confirmés: {item['confirmed_count']['before']} → {item['confirmed_count']['after']}")
+            print(f"   Liste d'attente: {item['waitlist_count']['before']} → {item['waitlist_count']['after']}")
+
+        print(f"\n✅ {len(corrected)} événement(s) corrigé(s)")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur: {str(e)}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
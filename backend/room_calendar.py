@@ -0,0 +1,102 @@
+"""
+Calendrier des salles : réservations en mémoire par salle, détection des doubles réservations
+
+Les réservations d'une même salle ne se chevauchent jamais : triées par début,
+elles sont aussi triées par fin. Deux tableaux triés (débuts, fins) suffisent
+alors à trouver par recherche dichotomique les réservations qui recoupent un
+intervalle, en O(log n).
+
+Chaque salle porte en base un numéro de version incrémenté à chaque réservation
+ou libération ; une salle dont la version en mémoire diffère de celle de la base
+est rechargée, ce qui garde l'index cohérent entre plusieurs processus.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Booking = Tuple[datetime, datetime, str]  # (début, fin exclue, event_id)
+
+class _RoomBookings:
+    """Réservations d'une salle, triées par début"""
+
+    def __init__(self, version: int, bookings: Iterable[Booking]):
+        self.version = version
+        self.bookings: List[Booking] = sorted(bookings)
+        self.starts = [start for start, _, _ in self.bookings]
+        self.ends = [end for _, end, _ in self.bookings]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Booking]:
+        # Première réservation finissant après start, première commençant à end ou après
+        low = bisect_right(self.ends, start)
+        high = bisect_left(self.starts, end)
+        return self.bookings[low:high]
+
+    def remove(self, event_id: str):
+        for index, (_, _, booked_event_id) in enumerate(self.bookings):
+            if booked_event_id == event_id:
+                del self.bookings[index], self.starts[index], self.ends[index]
+                return
+
+    def add(self, start: datetime, end: datetime, event_id: str):
+        index = bisect_left(self.starts, start)
+        self.bookings.insert(index, (start, end, event_id))
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+class RoomCalendar:
+    """Index en mémoire des réservations de toutes les salles"""
+
+    def __init__(self):
+        self._rooms: Dict[str, _RoomBookings] = {}
+        self._lock = threading.RLock()
+
+    def is_current(self, room_id: str, version: int) -> bool:
+        """La salle est-elle chargée à la version de la base ?"""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            return room is not None and room.version == version
+
+    def load_room(self, room_id: str, version: int, bookings: Iterable[Booking]):
+        """(Re)chargement complet des réservations d'une salle"""
+        with self._lock:
+            self._rooms[str(room_id)] = _RoomBookings(version, ((start, end, str(event_id)) for start, end, event_id in bookings))
+
+    def find_conflicts(self, room_id: str, start: datetime, end: datetime,
+                       exclude_event_id: Optional[str] = None) -> List[Booking]:
+        """Réservations de la salle qui chevauchent [start, end)"""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return []
+            return [
+                booking for booking in room.overlapping(start, end)
+                if booking[2] != (str(exclude_event_id) if exclude_event_id else None)
+            ]
+
+    def bookings_between(self, room_id: str, start: datetime, end: datetime) -> List[Booking]:
+        """Réservations de la salle sur la période [start, end)"""
+        return self.find_conflicts(room_id, start, end)
+
+    def book(self, room_id: str, version: int, event_id: str, start: datetime, end: datetime):
+        """Enregistre (ou déplace) la réservation d'un événement après validation en base"""
+        self._apply(room_id, version, str(event_id), (start, end))
+
+    def release(self, room_id: str, version: int, event_id: str):
+        """Retire la réservation d'un événement après validation en base"""
+        self._apply(room_id, version, str(event_id), None)
+
+    def _apply(self, room_id: str, version: int, event_id: str, interval: Optional[Tuple[datetime, datetime]]):
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return
+            if room.version != version - 1:
+                # Une autre écriture s'est intercalée : la salle sera rechargée
+                del self._rooms[str(room_id)]
+                return
+            room.remove(event_id)
+            if interval is not None:
+                room.add(interval[0], interval[1], event_id)
+            room.version = version
@@ -1,9 +1,12 @@
 import logging
+import time
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, extract
+from shared.models.employee import Employee
 from shared.models.leave import LeaveRequest, LeaveType, LeaveStatus
+from shared.leave_statistics import summarize_leave_groups
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,10 @@ class LeaveService:
     _instance = None
     _initialized = False
     
+    # Cache des statistiques : clé (employee_id, début, fin) -> (horodatage, résultat)
+    STATISTICS_TTL_SECONDS = 60
+    _statistics_cache: Dict[tuple, tuple] = {}
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(LeaveService, cls).__new__(cls)
@@ -57,8 +64,10 @@ class LeaveService:
         """Récupération d'un congé par ID"""
         return db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
     
-    def create_leave_request(self, db: Session, leave_data: dict) -> LeaveRequest:
-        """Création d'une nouvelle demande de congé"""
+    def create_leave_request(self, db: Session, leave_data: dict) -> Optional[LeaveRequest]:
+        """Création d'une nouvelle demande de congé (None si elle chevauche une demande active)"""
+        if self.check_leave_conflicts(db, leave_data["employee_id"], leave_data["start_date"], leave_data["end_date"]):
+            return None
         leave = LeaveRequest(**leave_data)
         db.add(leave)
         db.commit()
@@ -141,33 +150,54 @@ class LeaveService:
             )
         ).all()
     
-    def check_leave_conflicts(self, db: Session, employee_id: str, start_date: datetime, end_date: datetime) -> List[LeaveRequest]:
-        """Vérification des conflits de congés"""
-        return db.query(LeaveRequest).filter(
+    def check_leave_conflicts(self, db: Session, employee_id: str, start_date: datetime, end_date: datetime,
+                              exclude_leave_id: Optional[str] = None) -> List[LeaveRequest]:
+        """Vérification des conflits de congés (demandes en attente ou approuvées)"""
+        query = db.query(LeaveRequest).filter(
             and_(
                 LeaveRequest.employee_id == employee_id,
-                LeaveRequest.status == LeaveStatus.approved,
+                LeaveRequest.status.in_([LeaveStatus.pending, LeaveStatus.approved]),
                 LeaveRequest.start_date <= end_date,
                 LeaveRequest.end_date >= start_date
             )
-        ).all()
-    
-    def get_leave_statistics(self, db: Session, employee_id: Optional[str] = None) -> Dict[str, Any]:
-        """Statistiques des congés"""
-        query = db.query(LeaveRequest)
+        )
+        if exclude_leave_id:
+            query = query.filter(LeaveRequest.id != exclude_leave_id)
+        return query.all()
+    
+    def get_leave_statistics(self, db: Session, employee_id: Optional[str] = None,
+                             start_date: Optional[datetime] = None,
+                             end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Statistiques des congés en une seule requête GROUP BY
+
+        Les comptages par statut, type, département et mois sont dérivés des groupes
+        (statut, type, département, mois de début). Résultat mis en cache quelques secondes.
+        """
+        cache_key = (employee_id, start_date, end_date)
+        cached = self._statistics_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.STATISTICS_TTL_SECONDS:
+            return cached[1]
+        
+        start_year = extract('year', LeaveRequest.start_date)
+        start_month = extract('month', LeaveRequest.start_date)
+        query = db.query(
+            LeaveRequest.status, LeaveRequest.type, Employee.department,
+            start_year, start_month, func.count(LeaveRequest.id)
+        ).join(Employee, Employee.id == LeaveRequest.employee_id)
         
         if employee_id:
             query = query.filter(LeaveRequest.employee_id == employee_id)
+        if start_date:
+            query = query.filter(LeaveRequest.end_date >= start_date)
+        if end_date:
+            query = query.filter(LeaveRequest.start_date <= end_date)
         
-        total_leaves = query.count()
-        pending_leaves = query.filter(LeaveRequest.status == LeaveStatus.pending).count()
-        approved_leaves = query.filter(LeaveRequest.status == LeaveStatus.approved).count()
-        rejected_leaves = query.filter(LeaveRequest.status == LeaveStatus.rejected).count()
+        rows = query.group_by(
+            LeaveRequest.status, LeaveRequest.type, Employee.department, start_year, start_month
+        ).all()
         
-        return {
-            "total": total_leaves,
-            "pending": pending_leaves,
-            "approved": approved_leaves,
-            "rejected": rejected_leaves,
-            "approval_rate": (approved_leaves / total_leaves * 100) if total_leaves > 0 else 0
-        }
+        statistics = summarize_leave_groups(rows)
+        if len(self._statistics_cache) >= 256:
+            self._statistics_cache.clear()
+        self._statistics_cache[cache_key] = (time.monotonic(), statistics)
+        return statistics
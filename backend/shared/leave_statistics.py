@@ -0,0 +1,35 @@
+"""
+Statistiques des congés à partir des groupes d'une requête GROUP BY
+
+Partagé par l'application monolithique (main.py) et le service des congés.
+"""
+
+from typing import Any, Dict
+
+def summarize_leave_groups(rows) -> Dict[str, Any]:
+    """Agrégation des groupes (statut, type, département, année, mois, nombre) en statistiques"""
+    def empty():
+        return {"total": 0, "pending": 0, "approved": 0, "rejected": 0}
+
+    totals = empty()
+    by_type: Dict[str, Dict[str, int]] = {}
+    by_department: Dict[str, Dict[str, int]] = {}
+    by_month: Dict[str, Dict[str, int]] = {}
+
+    for status, leave_type, department, year, month, count in rows:
+        status = getattr(status, "value", status)
+        leave_type = getattr(leave_type, "value", leave_type)
+        month_key = f"{int(year):04d}-{int(month):02d}"
+        for bucket in (totals, by_type.setdefault(leave_type, empty()),
+                       by_department.setdefault(department, empty()),
+                       by_month.setdefault(month_key, empty())):
+            bucket["total"] += count
+            bucket[status] += count
+
+    return {
+        **totals,
+        "approval_rate": (totals["approved"] / totals["total"] * 100) if totals["total"] > 0 else 0,
+        "by_type": by_type,
+        "by_department": by_department,
+        "by_month": dict(sorted(by_month.items()))
+    }
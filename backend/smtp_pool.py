@@ -0,0 +1,151 @@
+"""
+Envoi SMTP asynchrone avec pool de connexions
+
+Chaque connexion (connexion TCP, STARTTLS, authentification) est réutilisée pour
+de nombreux messages au lieu d'être rouverte à chaque email ; un sémaphore borne
+le nombre de connexions simultanées. Rien ne bloque la boucle d'événements :
+5 000 rappels coûtent au plus `size` poignées de main.
+"""
+
+import asyncio
+import logging
+import time
+from email.message import Message
+from typing import Iterable, List, Optional
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+class _PooledConnection:
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+class SMTPPool:
+    """Pool de connexions SMTP partagé par les envois d'une boucle d'événements"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        use_tls: bool = False,
+        size: int = 4,
+        timeout: float = 30,
+        idle_timeout: float = 60,
+        max_messages_per_connection: int = 500
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connections_opened = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[_PooledConnection] = []
+
+    def _bind_loop(self):
+        # Sémaphore et connexions appartiennent à une boucle : une nouvelle boucle repart d'un pool vide
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._idle = []
+
+    async def _connect(self) -> _PooledConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls if not self.use_tls else False,
+            timeout=self.timeout
+        )
+        await client.connect()
+        self.connections_opened += 1
+        return _PooledConnection(client)
+
+    async def _acquire(self) -> _PooledConnection:
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.client.is_connected and now - connection.last_used < self.idle_timeout:
+                return connection
+            await self._discard(connection)
+        return await self._connect()
+
+    def _release(self, connection: _PooledConnection):
+        connection.messages += 1
+        connection.last_used = time.monotonic()
+        if connection.messages >= self.max_messages_per_connection:
+            asyncio.ensure_future(self._discard(connection))
+        else:
+            self._idle.append(connection)
+
+    async def _discard(self, connection: _PooledConnection):
+        try:
+            if connection.client.is_connected:
+                await connection.client.quit()
+        except Exception:
+            connection.client.close()
+
+    async def send_message(self, message: Message, recipients: Optional[Iterable[str]] = None):
+        """Envoi d'un message sur une connexion du pool
+
+        Une connexion réutilisée qui a été fermée par le serveur entre deux envois est
+        remplacée et l'envoi retenté une fois ; les autres erreurs SMTP sont propagées.
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            connection = await self._acquire()
+            reused = connection.messages > 0
+            try:
+                result = await connection.client.send_message(message, recipients=recipients)
+            except aiosmtplib.SMTPServerDisconnected:
+                connection.client.close()
+                if not reused:
+                    raise
+                connection = await self._connect()
+                try:
+                    result = await connection.client.send_message(message, recipients=recipients)
+                except Exception:
+                    await self._discard(connection)
+                    raise
+            except aiosmtplib.SMTPRecipientsRefused:
+                # La connexion reste utilisable après un refus de destinataire
+                self._release(connection)
+                raise
+            except Exception:
+                await self._discard(connection)
+                raise
+            self._release(connection)
+            return result
+
+    async def send_many(self, messages: Iterable[Message]) -> List[Optional[Exception]]:
+        """Envoi concurrent de messages, borné par la taille du pool ; une erreur (ou None) par message"""
+        async def send(message: Message) -> Optional[Exception]:
+            try:
+                await self.send_message(message)
+                return None
+            except Exception as e:
+                logger.error(f"Erreur lors de l'envoi d'email à {message['To']}: {str(e)}")
+                return e
+
+        return await asyncio.gather(*(send(message) for message in messages))
+
+    async def close(self):
+        """Fermeture des connexions inactives (arrêt de l'application)"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
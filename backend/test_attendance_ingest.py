@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests des fonctions pures de l'import des pointages de badges
+"""
+
+import io
+from datetime import datetime, timedelta
+
+from attendance_ingest import (
+    EARLY_ARRIVAL, LATE_DEPARTURE, IngestReport, derive_attendance_status,
+    match_taps, merge_span, parse_timestamp, read_badge_taps
+)
+
+START = datetime(2026, 3, 2, 9, 0)
+END = datetime(2026, 3, 2, 12, 0)
+GRACE = timedelta(minutes=5)
+
+def test_parse_timestamp():
+    assert parse_timestamp("2026-03-02T09:00:00") == START
+    assert parse_timestamp(" 02/03/2026 09:00 ") == START
+    # Horodatage avec fuseau : ramené en UTC sans fuseau, comme en base
+    assert parse_timestamp("2026-03-02T10:00:00+01:00") == START
+    assert parse_timestamp("2026-03-02T09:00:00Z") == START
+    try:
+        parse_timestamp("hier matin")
+        assert False, "Horodatage invalide accepté"
+    except ValueError:
+        pass
+
+def test_read_badge_taps_chunks_and_errors():
+    stream = io.StringIO(
+        "Badge;Timestamp\n"
+        "B1;02/03/2026 08:55\n"
+        ";02/03/2026 09:00\n"
+        "B2;pas une date\n"
+        "B3\n"
+        "\n"
+        "B2;2026-03-02 09:10\n"
+        "B1;2026-03-02T12:01:00\n"
+    )
+    report = IngestReport()
+    chunks = list(read_badge_taps(stream, report, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0][0] == ("B1", datetime(2026, 3, 2, 8, 55), 2)
+    assert chunks[1][0][2] == 8
+    assert report.rows == 6
+    assert report.error_count == 3
+    assert [error["line"] for error in report.errors] == [3, 4, 5]
+
+def test_read_badge_taps_rejects_unknown_header():
+    try:
+        list(read_badge_taps(io.StringIO("nom,heure\nB1,2026-03-02 09:00\n"), IngestReport()))
+        assert False, "En-tête invalide accepté"
+    except ValueError:
+        pass
+
+def test_match_taps_duplicate_taps():
+    # Badgeuse passée plusieurs fois : une seule fenêtre première / dernière par (événement, employé)
+    report = IngestReport()
+    taps = [
+        ("B1", datetime(2026, 3, 2, 8, 58), 2),
+        ("B1", datetime(2026, 3, 2, 8, 58), 3),
+        ("B1", datetime(2026, 3, 2, 12, 2), 4),
+        ("B1", datetime(2026, 3, 2, 8, 50), 5),
+    ]
+    spans = match_taps(taps, {"B1": "emp-1"}, {"emp-1": [(START, END, "evt-1")]}, report)
+
+    assert spans == {("evt-1", "emp-1"): [datetime(2026, 3, 2, 8, 50), datetime(2026, 3, 2, 12, 2)]}
+    assert report.matched_taps == 4
+
+def test_match_taps_out_of_window_and_unknown_badge():
+    report = IngestReport()
+    windows = {"emp-1": [(START, END, "evt-1")]}
+    taps = [
+        ("B1", START - EARLY_ARRIVAL - timedelta(minutes=1), 2),
+        ("B1", END + LATE_DEPARTURE + timedelta(minutes=1), 3),
+        ("B1", START - EARLY_ARRIVAL, 4),
+        ("B9", START, 5),
+    ]
+    spans = match_taps(taps, {"B1": "emp-1"}, windows, report)
+
+    assert spans == {("evt-1", "emp-1"): [START - EARLY_ARRIVAL, START - EARLY_ARRIVAL]}
+    assert report.unmatched_taps == 2
+    assert report.unknown_badges == 1
+    assert report.to_dict()["unknown_badge_samples"] == ["B9"]
+
+def test_match_taps_nearest_event_start():
+    # Deux événements proches : le pointage va à celui dont le début est le plus proche
+    report = IngestReport()
+    afternoon = (datetime(2026, 3, 2, 13, 0), datetime(2026, 3, 2, 15, 0), "evt-2")
+    spans = match_taps(
+        [("B1", datetime(2026, 3, 2, 12, 40), 2)],
+        {"B1": "emp-1"}, {"emp-1": [(START, END, "evt-1"), afternoon]}, report
+    )
+    assert list(spans) == [("evt-2", "emp-1")]
+
+def test_merge_span_with_existing_record():
+    first, last = datetime(2026, 3, 2, 9, 10), datetime(2026, 3, 2, 11, 0)
+    # Aucune fiche : un pointage unique ne donne pas de sortie
+    assert merge_span(None, None, first, first) == (first, None)
+    assert merge_span(None, None, first, last) == (first, last)
+    # Fiche existante : première entrée, dernière sortie
+    assert merge_span(datetime(2026, 3, 2, 8, 55), datetime(2026, 3, 2, 10, 0), first, last) == \
+        (datetime(2026, 3, 2, 8, 55), last)
+    assert merge_span(datetime(2026, 3, 2, 8, 55), datetime(2026, 3, 2, 12, 5), first, last) == \
+        (datetime(2026, 3, 2, 8, 55), datetime(2026, 3, 2, 12, 5))
+    # Entrée seule en base, nouveau pointage plus tardif : il devient la sortie
+    assert merge_span(first, None, last, last) == (first, last)
+    # Réimport du même fichier : résultat inchangé
+    assert merge_span(first, last, first, last) == (first, last)
+
+def test_derive_attendance_status():
+    assert derive_attendance_status(None, None, START, END, GRACE) == "absent"
+    assert derive_attendance_status(START + GRACE, END, START, END, GRACE) == "present"
+    assert derive_attendance_status(START + GRACE + timedelta(minutes=1), END, START, END, GRACE) == "late"
+    assert derive_attendance_status(START, END - GRACE - timedelta(minutes=1), START, END, GRACE) == "left_early"
+    assert derive_attendance_status(START, None, START, END, GRACE) == "present"
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
+    print("✅ Import des pointages : tous les tests passent")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test des décisions groupées de congés : périmètre d'un manager
+
+Directement contre la base locale (DATABASE_URL) : un manager ne peut statuer ni
+sur les demandes d'un autre département, ni sur les siennes.
+"""
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from main import (
+    Employee, LeaveLedgerEntry, LeaveRequest, LeaveStatus, LeaveType, Notification,
+    SessionLocal, app, create_access_token
+)
+
+def create_fixtures(db):
+    """Un manager Ops, un employé Ops, un employé Dev et une demande en attente pour chacun"""
+    run_id = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+
+    def employee(role: str, department: str) -> Employee:
+        return Employee(
+            name=f"Test {role} {department}",
+            email=f"bulk.{role}.{department}.{run_id}@test.local".lower(),
+            password_hash="!",
+            role=role,
+            department=department,
+            job_title="Test",
+            seniority="Junior"
+        )
+
+    manager, teammate, outsider = employee("manager", "Ops"), employee("employee", "Ops"), employee("employee", "Dev")
+    db.add_all([manager, teammate, outsider])
+    db.flush()
+
+    leaves = {
+        name: LeaveRequest(
+            employee_id=owner.id, department=owner.department, type=LeaveType.annual,
+            start_date=datetime(2031, 3, 3 + 7 * index), end_date=datetime(2031, 3, 4 + 7 * index),
+            status=LeaveStatus.pending, reason="Test"
+        )
+        for index, (name, owner) in enumerate((("own", manager), ("teammate", teammate), ("outsider", outsider)))
+    }
+    db.add_all(leaves.values())
+    db.commit()
+    return manager, [manager, teammate, outsider], {name: str(leave.id) for name, leave in leaves.items()}
+
+def cleanup_fixtures(db, employees: list, leave_ids: list):
+    """Suppression des données de test"""
+    employee_ids = [employee.id for employee in employees]
+    db.query(LeaveLedgerEntry).filter(LeaveLedgerEntry.employee_id.in_(employee_ids)).delete(synchronize_session=False)
+    db.query(Notification).filter(Notification.user_id.in_(employee_ids)).delete(synchronize_session=False)
+    db.query(LeaveRequest).filter(LeaveRequest.id.in_(leave_ids)).delete(synchronize_session=False)
+    db.query(Employee).filter(Employee.id.in_(employee_ids)).delete(synchronize_session=False)
+    db.commit()
+
+def decide(client: TestClient, manager: Employee, leave_ids: dict, decision: str) -> dict:
+    response = client.post(
+        "/api/leaves/bulk-decision",
+        headers={"Authorization": f"Bearer {create_access_token({'sub': str(manager.id)})}"},
+        json={"decisions": [{"leave_id": leave_id, "decision": decision} for leave_id in leave_ids.values()]}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def test_manager_bulk_decision_scope():
+    db = SessionLocal()
+    manager, employees, leave_ids = create_fixtures(db)
+    client = TestClient(app)
+
+    try:
+        # Approbation : seule la demande du collègue du même département passe
+        data = decide(client, manager, leave_ids, "approve")
+        assert data["approved"] == [leave_ids["teammate"]]
+        assert sorted(data["skipped"]) == sorted([leave_ids["own"], leave_ids["outsider"]])
+
+        # Rejet : même périmètre, la demande déjà approuvée est ignorée
+        data = decide(client, manager, leave_ids, "reject")
+        assert data["rejected"] == []
+        assert sorted(data["skipped"]) == sorted(leave_ids.values())
+
+        db.expire_all()
+        statuses = {
+            name: db.query(LeaveRequest.status).filter(LeaveRequest.id == leave_id).scalar()
+            for name, leave_id in leave_ids.items()
+        }
+        assert statuses == {
+            "own": LeaveStatus.pending,
+            "teammate": LeaveStatus.approved,
+            "outsider": LeaveStatus.pending,
+        }, statuses
+    finally:
+        cleanup_fixtures(db, employees, list(leave_ids.values()))
+        db.close()
+
+if __name__ == "__main__":
+    test_manager_bulk_decision_scope()
+    print("✅ Décisions groupées : demandes hors département et auto-approbation refusées")
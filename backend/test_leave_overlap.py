@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test de la détection de chevauchement des congés
+
+Directement contre la base locale (DATABASE_URL) : le contrôle de chevauchement
+suit la même convention que la disponibilité (leave_interval), journées entières
+et date de fin incluse.
+"""
+
+from datetime import datetime
+
+from availability import leave_interval
+from main import Employee, LeaveRequest, LeaveStatus, LeaveType, SessionLocal, find_overlapping_leave
+
+def days_overlap(first: tuple, second: tuple) -> bool:
+    """Chevauchement au sens de la disponibilité : intervalles [début, fin) de leave_interval"""
+    first_start, first_end = leave_interval(*first)
+    second_start, second_end = leave_interval(*second)
+    return first_start < second_end and second_start < first_end
+
+def test_back_to_back_leaves():
+    db = SessionLocal()
+    run_id = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+    employee = Employee(
+        name="Test overlap", email=f"overlap.{run_id}@test.local", password_hash="!",
+        department="Test", job_title="Test", seniority="Junior"
+    )
+    db.add(employee)
+    db.flush()
+    # Congé existant du lundi au vendredi midi
+    existing = (datetime(2031, 3, 3), datetime(2031, 3, 7, 12, 0))
+    leave = LeaveRequest(employee_id=employee.id, department="Test", type=LeaveType.annual,
+                         start_date=existing[0], end_date=existing[1], status=LeaveStatus.approved, reason="Test")
+    db.add(leave)
+    db.commit()
+
+    cases = {
+        # Commence le jour où l'autre finit : ce jour est occupé deux fois
+        "starts on the last day": ((datetime(2031, 3, 7, 14, 0), datetime(2031, 3, 10)), True),
+        # Finit le jour où l'autre commence
+        "ends on the first day": ((datetime(2031, 2, 27), datetime(2031, 3, 3)), True),
+        # Dos à dos sans jour commun
+        "starts the next day": ((datetime(2031, 3, 8), datetime(2031, 3, 10)), False),
+        "ends the day before": ((datetime(2031, 2, 27), datetime(2031, 3, 2, 18, 0)), False),
+    }
+
+    try:
+        for name, (period, expected) in cases.items():
+            found = find_overlapping_leave(db, employee.id, *period) is not None
+            assert found == expected, f"{name}: chevauchement {found}, attendu {expected}"
+            assert found == days_overlap(existing, period), f"{name}: incohérent avec leave_interval"
+    finally:
+        db.query(LeaveRequest).filter(LeaveRequest.id == leave.id).delete(synchronize_session=False)
+        db.query(Employee).filter(Employee.id == employee.id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+if __name__ == "__main__":
+    test_back_to_back_leaves()
+    print("✅ Chevauchement des congés cohérent avec la disponibilité")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test du pool SMTP asynchrone contre un serveur aiosmtpd local
+"""
+
+import asyncio
+import socket
+from email.message import EmailMessage
+
+from aiosmtpd.controller import Controller
+
+from smtp_pool import SMTPPool
+
+class CountingHandler:
+    """Compte les connexions (EHLO/HELO) et les messages reçus"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+def build_message(index: int) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@company.com"
+    message["To"] = f"employee{index}@company.com"
+    message["Subject"] = f"Rappel {index}"
+    message.set_content("Votre événement commence dans 1 heure.")
+    return message
+
+async def run_pool_test(port: int, handler: CountingHandler, count: int, size: int):
+    pool = SMTPPool(hostname="127.0.0.1", port=port, start_tls=False, size=size)
+    errors = await pool.send_many(build_message(index) for index in range(count))
+    await pool.close()
+    return pool, errors
+
+def free_port() -> int:
+    """Port TCP libre sur la boucle locale (exécutions parallèles sans collision)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def send_through_pool(count: int = 500, size: int = 4):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        pool, errors = asyncio.run(run_pool_test(controller.port, handler, count, size))
+    finally:
+        controller.stop()
+    return handler, pool, [error for error in errors if error]
+
+def check_delivery(handler: CountingHandler, pool: SMTPPool, failed: list, count: int, size: int):
+    assert handler.messages == count, "Messages manquants"
+    assert not failed, f"Erreurs d'envoi: {failed[:3]}"
+    assert pool.connections_opened <= size, "Connexions non réutilisées"
+
+def test_smtp_pool(count: int = 500, size: int = 4):
+    check_delivery(*send_through_pool(count, size), count, size)
+
+if __name__ == "__main__":
+    count, size = 500, 4
+    print(f"Envoi de {count} emails avec un pool de {size} connexion(s)...")
+    handler, pool, failed = send_through_pool(count, size)
+    print(f"✓ {handler.messages} message(s) reçu(s), {len(failed)} erreur(s)")
+    print(f"✓ {pool.connections_opened} connexion(s) ouverte(s), {handler.sessions} EHLO côté serveur")
+    check_delivery(handler, pool, failed, count, size)
+    print("✅ Pool SMTP opérationnel")
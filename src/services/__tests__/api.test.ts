@@ -446,6 +446,52 @@ describe('API Services', () => {
       const response = await attendanceApi.update('1', updatedAttendance);
       expect(response.data).toEqual(mockResponse);
     });
+
+    it('should send queued scans in one bulk check-in call', async () => {
+      const mockResponse = {
+        success: true,
+        data: {
+          results: [{ index: 0, action: 'checkin', attendanceId: '1', success: true, result: 'checked_in' }],
+        },
+        message: '1 pointage(s) traité(s), 0 en échec',
+      };
+
+      mock.onPost('/attendance/bulk-checkin').reply(200, mockResponse);
+
+      const response = await attendanceApi.bulkCheckIn([
+        { confirmationCode: 'ABC123', action: 'checkin', timestamp: '2026-10-20T09:00:00' },
+      ]);
+      expect(response.data).toEqual(mockResponse);
+      expect(JSON.parse(mock.history.post[mock.history.post.length - 1].data)).toEqual({
+        scans: [{ confirmation_code: 'ABC123', action: 'checkin', timestamp: '2026-10-20T09:00:00' }],
+      });
+    });
+
+    it('should fetch attendance stats for several events', async () => {
+      const mockResponse = {
+        success: true,
+        data: [
+          {
+            eventId: '1',
+            title: 'Onboarding',
+            startDate: new Date().toISOString(),
+            totalRegistered: 10,
+            totalPresent: 8,
+            totalAbsent: 1,
+            totalLate: 1,
+            attendanceRate: 80,
+            lateRate: 10,
+          },
+        ],
+        message: 'Statistiques de 1 événement(s)',
+      };
+
+      mock.onPost('/attendance/stats/batch').reply(200, mockResponse);
+
+      const response = await attendanceApi.getStatsBatch({ eventIds: ['1'] });
+      expect(response.data).toEqual(mockResponse);
+      expect(JSON.parse(mock.history.post[mock.history.post.length - 1].data)).toEqual({ event_ids: ['1'] });
+    });
   });
 
   describe('Event Registration API', () => {
@@ -545,6 +591,22 @@ describe('API Services', () => {
       expect(response.data).toEqual(mockResponse);
     });
 
+    it('should get capacities for several events', async () => {
+      const mockResponse = {
+        success: true,
+        data: [
+          { eventId: '1', maxAttendees: 50, currentAttendees: 25, waitlistEnabled: true, waitlistSize: 0 },
+          { eventId: '2', maxAttendees: 20, currentAttendees: 20, waitlistEnabled: true, waitlistSize: 3 },
+        ],
+        message: '2 capacité(s) récupérée(s)',
+      };
+
+      mock.onPost('/event-registrations/capacity/batch').reply(200, mockResponse);
+
+      const response = await eventRegistrationApi.getCapacities(['1', '2']);
+      expect(response.data).toEqual(mockResponse);
+    });
+
     it('should confirm registration', async () => {
       const mockResponse = {
         success: true,
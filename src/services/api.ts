@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Employee, Event, LeaveRequest, Report, Notification, ApiResponse, PaginatedResponse, Attendance, AttendanceStats, AuthResponse, EmailCredentials, EventCapacity, EventRegistration, LDAPConfig, LDAPCredentials, Permission, PermissionCheck, RegistrationConflict, RegistrationRequest, RegistrationResponse, SSOConfig, User, SecurityAuditLog, SecurityReport } from '../types';
+import { Employee, Event, LeaveRequest, Report, Notification, ApiResponse, PaginatedResponse, Attendance, AttendanceScan, AttendanceScanResult, AttendanceStats, EventAttendanceStats, AuthResponse, EmailCredentials, EventCapacity, EventRegistration, LDAPConfig, LDAPCredentials, Permission, PermissionCheck, RegistrationConflict, RegistrationRequest, RegistrationResponse, SSOConfig, User, SecurityAuditLog, SecurityReport } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
@@ -138,6 +138,14 @@ export const attendanceApi = {
   getStats: (eventId: string) =>
     api.get<ApiResponse<AttendanceStats>>(`/attendance/stats/${eventId}`),
   
+  // Statistiques de plusieurs événements (liste d'identifiants ou période) en un seul appel
+  getStatsBatch: (params: { eventIds?: string[]; start?: string; end?: string }) =>
+    api.post<ApiResponse<EventAttendanceStats[]>>('/attendance/stats/batch', {
+      event_ids: params.eventIds,
+      start: params.start,
+      end: params.end,
+    }),
+  
   register: (eventId: string, employeeId: string) =>
     api.post<ApiResponse<Attendance>>(`/attendance/register`, { eventId, employeeId }),
   
@@ -147,6 +155,17 @@ export const attendanceApi = {
   checkOut: (attendanceId: string, checkOutTime: string) =>
     api.post<ApiResponse<Attendance>>(`/attendance/${attendanceId}/checkout`, { checkOutTime }),
   
+  // Envoi groupé des pointages d'une borne (file d'attente hors ligne comprise)
+  bulkCheckIn: (scans: AttendanceScan[]) =>
+    api.post<ApiResponse<{ results: AttendanceScanResult[] }>>('/attendance/bulk-checkin', {
+      scans: scans.map((scan) => ({
+        attendance_id: scan.attendanceId,
+        confirmation_code: scan.confirmationCode,
+        action: scan.action,
+        timestamp: scan.timestamp,
+      })),
+    }),
+  
   updateStatus: (attendanceId: string, status: string, notes?: string) =>
     api.put<ApiResponse<Attendance>>(`/attendance/${attendanceId}/status`, { status, notes }),
   
@@ -212,6 +231,15 @@ export const eventRegistrationApi = {
     return api.get<ApiResponse<EventCapacity>>(`/event-registrations/capacity/${eventId}`);
   },
   
+  // Récupération de la capacité de plusieurs événements en un seul appel
+  getCapacities: (eventIds: string[]) => {
+    if (!eventIds.length) {
+      throw new Error('Liste d\'événements invalide');
+    }
+    
+    return api.post<ApiResponse<EventCapacity[]>>('/event-registrations/capacity/batch', { event_ids: eventIds });
+  },
+  
   // Validation de confirmation d'inscription (2FA)
   confirmRegistration: (registrationId: string, confirmationCode: string) => {
     if (!registrationId || !confirmationCode) {
@@ -89,6 +89,27 @@ export interface AttendanceStats {
   lateRate: number;
 }
 
+export interface AttendanceScan {
+  attendanceId?: string;
+  confirmationCode?: string;
+  action: 'checkin' | 'checkout';
+  timestamp: string;
+}
+
+export interface AttendanceScanResult {
+  index: number;
+  action: 'checkin' | 'checkout';
+  attendanceId: string | null;
+  success: boolean;
+  result: string;
+}
+
+export interface EventAttendanceStats extends AttendanceStats {
+  eventId: string;
+  title: string;
+  startDate: string;
+}
+
 export interface ApiResponse<T> {
   data: T;
   message: string;